@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the ASGI serving mode: concurrent /payment/status checks against a
+slow eSewa status API, served once with every request on the thread pool (sync
+mode, as under gunicorn gthread) and once with the async views (asgi.py).
+Both runs use the same uvicorn server and the same number of threads.
+Uses a throwaway SQLite database unless DATABASE_URL is set
+"""
+
+import sys
+import os
+import json
+import time
+import socket
+import asyncio
+import tempfile
+import threading
+import statistics
+from datetime import date, time as dtime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'async_serving.db')}"
+
+REQUESTS = int(os.environ.get('BENCH_REQUESTS', 200))
+CONCURRENCY = int(os.environ.get('BENCH_CONCURRENCY', 100))
+THREADS = int(os.environ.get('BENCH_THREADS', 4))
+ESEWA_LATENCY = float(os.environ.get('BENCH_ESEWA_LATENCY', 0.25))  # seconds per status call
+
+class SlowStatusAPI(BaseHTTPRequestHandler):
+    """Stand-in for the eSewa status API that takes ESEWA_LATENCY to answer"""
+    def do_GET(self):
+        time.sleep(ESEWA_LATENCY)
+        body = json.dumps({'status': 'PENDING', 'ref_id': None}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class StatusAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+def start_status_api():
+    server = StatusAPIServer(('127.0.0.1', 0), SlowStatusAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def seed(app, db):
+    from models.user import User
+    from models.appointment import Appointment
+    from models.payment import Payment
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        doctor = User(name='Doc', email='doc@bench', password_hash='x', role='doctor',
+                      private_key='k', public_key='k', consultation_fee=500)
+        patient = User(name='Pat', email='pat@bench', password_hash='x', role='patient',
+                       private_key='k', public_key='k')
+        db.session.add_all([doctor, patient])
+        db.session.commit()
+        uuids = []
+        # One payment per request per run, so the status cache never answers for eSewa
+        for i in range(REQUESTS * 2):
+            appt = Appointment(patient_id=patient.id, doctor_id=doctor.id, date=date.today(),
+                               time=dtime(i // 60 % 24, i % 60), status='pending')
+            db.session.add(appt)
+            db.session.flush()
+            transaction_uuid = f'async-{i:06d}'
+            db.session.add(Payment(appointment_id=appt.id, transaction_uuid=transaction_uuid,
+                                   amount=500, tax_amount=65, total_amount=565))
+            uuids.append(transaction_uuid)
+        db.session.commit()
+        patient_id = patient.id
+
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = patient_id
+        s['user_role'] = 'patient'
+    return uuids, client.get_cookie(app.config['SESSION_COOKIE_NAME']).value
+
+def serve(asgi_app):
+    """Run asgi_app under uvicorn on a background thread; returns (base url, server)"""
+    import uvicorn
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f'http://127.0.0.1:{port}', server
+
+async def burst(base_url, cookie, uuids):
+    """Fire every status check with at most CONCURRENCY in flight, return latencies in ms"""
+    import httpx
+
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    async with httpx.AsyncClient(base_url=base_url, cookies={'session': cookie}, limits=limits, timeout=120) as client:
+        async def hit(transaction_uuid):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(f'/payment/status/{transaction_uuid}')
+                assert response.status_code == 200, response.status_code
+                assert response.json().get('status') == 'PENDING', response.text
+                return (time.perf_counter() - started) * 1000
+        return await asyncio.gather(*(hit(u) for u in uuids))
+
+def run(name, asgi_app, cookie, uuids):
+    base_url, server = serve(asgi_app)
+    try:
+        started = time.perf_counter()
+        latencies = asyncio.run(burst(base_url, cookie, uuids))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.should_exit = True
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name}: {len(latencies)} status checks in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.0f}/s), p50 {statistics.median(latencies):.0f}ms, p99 {p99:.0f}ms")
+    return len(latencies) / elapsed
+
+def test_async_serving_capacity():
+    """Async views keep answering while eSewa is slow; sync mode is capped at THREADS / latency"""
+    status_api = start_status_api()
+    os.environ['ESEWA_STATUS_URL'] = f'http://127.0.0.1:{status_api.server_port}/status/'
+
+    from app import app, db, create_asgi_app
+    from utils.asgi import AsgiDispatcher
+
+    print(f"🔍 Benchmarking {REQUESTS} status checks, {CONCURRENCY} concurrent, "
+          f"{THREADS} threads, eSewa latency {ESEWA_LATENCY * 1000:.0f}ms...")
+    uuids, cookie = seed(app, db)
+
+    # Same dispatcher without async views: every request runs on the thread pool
+    sync_rate = run('sync mode ', AsgiDispatcher(app, [], threads=THREADS), cookie, uuids[:REQUESTS])
+    async_rate = run('async mode', create_asgi_app(app, threads=THREADS), cookie, uuids[REQUESTS:])
+
+    print(f"   sync mode ceiling is about {THREADS / ESEWA_LATENCY:.0f}/s ({THREADS} threads / eSewa latency)")
+    assert async_rate > sync_rate * 1.5, f'async {async_rate:.0f}/s vs sync {sync_rate:.0f}/s'
+    print(f"✅ Async mode served {async_rate / sync_rate:.1f}x the status checks per second")
+    status_api.shutdown()
+
+if __name__ == '__main__':
+    test_async_serving_capacity()
+    print("🎉 Async serving benchmark completed successfully!")
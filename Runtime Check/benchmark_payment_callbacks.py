@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the eSewa success callback under a burst of (duplicate) callbacks,
+plus checks that a late callback never revives a cancelled or rejected appointment
+and that the unsigned failure redirect only ever fails a pending payment
+Uses a throwaway SQLite database unless DATABASE_URL is set
+"""
+
+import sys
+import os
+import time
+import json
+import base64
+import hmac
+import hashlib
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as dtime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'callbacks.db')}"
+
+PAYMENTS = int(os.environ.get('BENCH_PAYMENTS', 200))
+DUPLICATES = int(os.environ.get('BENCH_DUPLICATES', 3))
+CONCURRENCY = int(os.environ.get('BENCH_CONCURRENCY', 16))
+
+def signed_callback(esewa, transaction_uuid, total_amount):
+    """Base64 callback payload signed the way eSewa signs it"""
+    data = {
+        'transaction_code': f'CODE{transaction_uuid[-6:]}',
+        'status': 'COMPLETE',
+        'total_amount': total_amount,
+        'transaction_uuid': transaction_uuid,
+        'product_code': esewa.product_code,
+        'signed_field_names': 'transaction_code,status,total_amount,transaction_uuid,product_code,signed_field_names',
+        'ref_id': f'REF{transaction_uuid[-6:]}'
+    }
+    message = ','.join(f'{field}={data[field]}' for field in data['signed_field_names'].split(','))
+    digest = hmac.new(esewa.secret_key.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).digest()
+    data['signature'] = base64.b64encode(digest).decode('utf-8')
+    return base64.b64encode(json.dumps(data).encode('utf-8')).decode('utf-8')
+
+def seed(app, db):
+    from models.user import User
+    from models.appointment import Appointment
+    from models.payment import Payment
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        doctor = User(name='Doc', email='doc@bench', password_hash='x', role='doctor',
+                      private_key='k', public_key='k', consultation_fee=500)
+        patient = User(name='Pat', email='pat@bench', password_hash='x', role='patient',
+                       private_key='k', public_key='k')
+        db.session.add_all([doctor, patient])
+        db.session.commit()
+        uuids = []
+        for i in range(PAYMENTS):
+            appt = Appointment(patient_id=patient.id, doctor_id=doctor.id, date=date.today(),
+                               time=dtime(i // 60 % 24, i % 60), status='pending')
+            db.session.add(appt)
+            db.session.flush()
+            transaction_uuid = f'bench-{i:06d}'
+            db.session.add(Payment(appointment_id=appt.id, transaction_uuid=transaction_uuid,
+                                   amount=500, tax_amount=65, total_amount=565))
+            uuids.append(transaction_uuid)
+        db.session.commit()
+    return uuids
+
+def burst(app, payloads):
+    """Fire all payloads concurrently, return per-request latencies in ms"""
+    def hit(payload):
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.get('/payment/success', query_string={'data': payload})
+        assert response.status_code == 200, response.status_code
+        return (time.perf_counter() - started) * 1000
+
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        return list(executor.map(hit, payloads))
+
+def report(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name}: {len(latencies)} callbacks in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.0f}/s), p50 {statistics.median(latencies):.1f}ms, p99 {p99:.1f}ms")
+
+def test_payment_callback_burst():
+    """Duplicate callbacks complete each payment once and replays write nothing"""
+    from sqlalchemy import event
+    from app import app, db
+    from models.payment import Payment
+    from utils.esewa import ESewaPayment
+
+    print("🔍 Benchmarking payment success callbacks...")
+    uuids = seed(app, db)
+    esewa = ESewaPayment()
+    payloads = [signed_callback(esewa, u, '565') for u in uuids]
+
+    rows_written = []
+    with app.app_context():
+        engine = db.engine
+
+    def count_writes(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('UPDATE', 'INSERT', 'DELETE', 'WITH')):
+            rows_written.append(max(cursor.rowcount, 0))
+    event.listen(engine, 'after_cursor_execute', count_writes)
+
+    try:
+        # First burst: every callback delivered DUPLICATES times at once
+        started = time.perf_counter()
+        latencies = burst(app, payloads * DUPLICATES)
+        report('first delivery + duplicates', latencies, time.perf_counter() - started)
+
+        with app.app_context():
+            completed = Payment.query.filter_by(status='completed').count()
+            assert completed == PAYMENTS, completed
+
+        # Replay burst: everything is already completed, nothing may be written
+        rows_written.clear()
+        started = time.perf_counter()
+        latencies = burst(app, payloads * DUPLICATES)
+        report('replayed callbacks', latencies, time.perf_counter() - started)
+        assert sum(rows_written) == 0, f'{sum(rows_written)} rows written by replays'
+        print("✅ Duplicate callbacks short-circuited without writes")
+    finally:
+        event.remove(engine, 'after_cursor_execute', count_writes)
+
+def test_callback_after_cancellation():
+    """A callback for an appointment cancelled or rejected meanwhile records the payment for refund"""
+    from app import app, db
+    from models.appointment import Appointment
+    from models.payment import Payment
+    from utils.esewa import ESewaPayment
+
+    print("🔍 Late callbacks for cancelled and rejected appointments...")
+    uuids = seed(app, db)[:3]
+    esewa = ESewaPayment()
+    with app.app_context():
+        payments = [Payment.query.filter_by(transaction_uuid=u).one() for u in uuids]
+        db.session.get(Appointment, payments[0].appointment_id).status = 'cancelled'
+        db.session.get(Appointment, payments[1].appointment_id).status = 'rejected'
+        db.session.commit()
+
+    client = app.test_client()
+    for transaction_uuid in uuids:
+        response = client.get('/payment/success', query_string={'data': signed_callback(esewa, transaction_uuid, '565')})
+        assert response.status_code == 200, response.status_code
+
+    with app.app_context():
+        for transaction_uuid, expected in zip(uuids, ['cancelled', 'rejected', 'approved']):
+            payment = Payment.query.filter_by(transaction_uuid=transaction_uuid).one()
+            appointment = db.session.get(Appointment, payment.appointment_id)
+            assert payment.status == 'completed', payment.status
+            assert appointment.status == expected, (transaction_uuid, appointment.status)
+            if expected == 'approved':
+                assert appointment.payment_id == payment.id and payment.refund_status is None
+            else:
+                assert appointment.payment_id is None, 'the payment must not be attached'
+                assert payment.refund_status == 'pending', payment.refund_status
+    print("✅ Cancelled and rejected appointments stay closed, their payments are flagged for refund")
+
+def test_failure_redirect():
+    """The failure redirect fails a pending payment once and never touches a completed one"""
+    from app import app, db
+    from models.payment import Payment
+    from models.payment_rollup import PaymentDailyRollup
+    from utils.esewa import ESewaPayment
+
+    print("🔍 Failure redirects for pending and completed payments...")
+    paid_uuid, pending_uuid = seed(app, db)[:2]
+    client = app.test_client()
+    response = client.get('/payment/success', query_string={'data': signed_callback(ESewaPayment(), paid_uuid, '565')})
+    assert response.status_code == 200, response.status_code
+
+    def rollups():
+        with app.app_context():
+            return {r.status: (r.payment_count, r.total_amount) for r in PaymentDailyRollup.query.all()}
+
+    def failure(transaction_uuid):
+        # Unsigned, exactly as anyone can craft it
+        data = base64.b64encode(json.dumps({'transaction_uuid': transaction_uuid, 'status': 'FAILED'}).encode()).decode()
+        return client.get('/payment/failure', query_string={'data': data})
+
+    before = rollups()
+    assert failure(paid_uuid).status_code == 200
+    assert rollups() == before, 'completed revenue must not move'
+    for _ in range(3):
+        assert failure(pending_uuid).status_code == 200
+    after = rollups()
+    with app.app_context():
+        statuses = {u: Payment.query.filter_by(transaction_uuid=u).one().status for u in (paid_uuid, pending_uuid)}
+    assert statuses == {paid_uuid: 'completed', pending_uuid: 'failed'}, statuses
+    assert after['completed'] == before['completed'], (before, after)
+    assert after['failed'][0] - before.get('failed', (0, 0))[0] == 1, (before, after)
+    assert after['pending'][0] - before['pending'][0] == -1, (before, after)
+    print("✅ Completed payment untouched, pending payment failed once across replays")
+
+if __name__ == '__main__':
+    test_callback_after_cancellation()
+    test_failure_redirect()
+    test_payment_callback_burst()
+    print("🎉 Payment callback benchmark completed successfully!")
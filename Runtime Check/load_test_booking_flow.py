@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test: register -> login -> book_appointment -> initiate_payment -> gateway -> payment_success
+Runs the app and the local eSewa simulator in-process on a throwaway SQLite
+database (or against --base-url) and reports p50/p99 latency per step.
+"""
+
+import argparse
+import logging
+import sys
+import os
+import re
+import time
+import html
+import tempfile
+import threading
+import statistics
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STEPS = ['register', 'login', 'book_appointment', 'initiate_payment', 'gateway', 'payment_success']
+
+def serve(wsgi_app):
+    """Serve a WSGI app on a free local port in a daemon thread"""
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, wsgi_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+def start_stack():
+    """App + simulator in this process, sharing nothing but HTTP"""
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}"
+    import app as app_module
+    from esewa_simulator import create_simulator
+
+    with app_module.app.app_context():
+        app_module.db.create_all()
+    # Every simulated user registers from 127.0.0.1 at once; admission control has its own test
+    app_module.app.config['ADMISSION_ENABLED'] = False
+    sim_server, sim_url = serve(create_simulator())
+    app_module.esewa.test_url = f'{sim_url}/api/epay/main/v2/form'
+    app_module.esewa.status_check_test_url = f'{sim_url}/api/epay/transaction/status/'
+    app_server, app_url = serve(app_module.app)
+    return app_url, [sim_server, app_server]
+
+def register(http, base_url, role, index, run_id, **extra):
+    data = {
+        'name': f'{role.title()} {index}', 'email': f'{role}{index}-{run_id}@loadtest.local',
+        'password': 'loadtest', 'gender': 'Other', 'age': '30', 'address': 'Kathmandu',
+        'contact_number': '9800000000', 'role': role
+    }
+    data.update(extra)
+    response = http.post(f'{base_url}/register', data=data)
+    match = re.search(r'/download_private_key/(\d+)', response.text)
+    assert response.status_code == 200 and match, f'register failed: {response.status_code}'
+    return int(match.group(1)), data
+
+def run_user(base_url, doctor_id, index, run_id, timings):
+    import requests
+
+    http = requests.Session()
+
+    def timed(step, fn):
+        started = time.perf_counter()
+        result = fn()
+        timings[step].append((time.perf_counter() - started) * 1000)
+        return result
+
+    user_id, data = timed('register', lambda: register(http, base_url, 'patient', index, run_id))
+    private_key = http.get(f'{base_url}/download_private_key/{user_id}').content
+
+    def login():
+        response = http.post(f'{base_url}/login', data={'email': data['email'], 'password': data['password']},
+                             files={'private_key': ('key.pem', private_key)}, allow_redirects=False)
+        assert response.status_code == 302, f'login failed: {response.status_code}'
+    timed('login', login)
+
+    # A unique date/time per user so bookings never collide
+    slot_date = (date.today() + timedelta(days=1 + index // 48)).isoformat()
+    slot_time = f'{(index % 48) // 2:02d}:{(index % 2) * 30:02d}'
+
+    def book():
+        response = http.post(f'{base_url}/book_appointment', data={
+            'doctor_id': doctor_id, 'date': slot_date, 'time': slot_time, 'notes': 'load test'
+        }, allow_redirects=False)
+        assert response.status_code == 302 and '/payment/' in response.headers['Location'], \
+            f'booking failed: {response.status_code}'
+        return response.headers['Location']
+    payment_path = timed('book_appointment', book)
+
+    def initiate():
+        response = http.get(requests.compat.urljoin(base_url, payment_path))
+        assert response.status_code == 200, f'initiate_payment failed: {response.status_code}'
+        action = html.unescape(re.search(r'<form action="([^"]+)" method="POST" id="esewa-form"', response.text).group(1))
+        fields = {name: html.unescape(value) for name, value in
+                  re.findall(r'<input type="hidden" name="([^"]+)" value="([^"]*)"', response.text)}
+        return action, fields
+    action, fields = timed('initiate_payment', initiate)
+
+    def gateway():
+        response = http.post(action, data=fields, allow_redirects=False)
+        assert response.status_code == 302, f'gateway failed: {response.status_code}'
+        return response.headers['Location']
+    callback_url = timed('gateway', gateway)
+
+    def success():
+        response = http.get(callback_url)
+        assert response.status_code == 200 and 'Payment Successful' in response.text, \
+            f'payment_success failed: {response.status_code}'
+    timed('payment_success', success)
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Booking to payment load test')
+    parser.add_argument('--users', type=int, default=int(os.environ.get('LOAD_USERS', 20)))
+    parser.add_argument('--concurrency', type=int, default=int(os.environ.get('LOAD_CONCURRENCY', 4)))
+    parser.add_argument('--base-url', help='Target a running app instead of starting one (it must use the simulator)')
+    args = parser.parse_args()
+
+    import requests
+
+    servers = []
+    base_url = args.base_url
+    if not base_url:
+        base_url, servers = start_stack()
+    run_id = str(int(time.time()))
+
+    try:
+        doctor_id, _ = register(requests.Session(), base_url, 'doctor', 0, run_id,
+                                specialization='General', consultation_fee='1000',
+                                available_days='Mon,Tue,Wed,Thu,Fri,Sat,Sun', available_time='18:00-18:30')
+        timings = {step: [] for step in STEPS}
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            futures = [executor.submit(run_user, base_url, doctor_id, i, run_id, timings) for i in range(args.users)]
+            errors = [f.exception() for f in futures if f.exception()]
+        elapsed = time.perf_counter() - started
+
+        print(f"\n{args.users} users, concurrency {args.concurrency}, {elapsed:.1f}s total, {len(errors)} failed")
+        print(f"{'step':<18}{'n':>6}{'p50 ms':>10}{'p99 ms':>10}")
+        for step in STEPS:
+            values = timings[step]
+            if values:
+                print(f"{step:<18}{len(values):>6}{statistics.median(values):>10.1f}{percentile(values, 99):>10.1f}")
+        for error in errors[:5]:
+            print(f"❌ {error}")
+        return 1 if errors else 0
+    finally:
+        for server in servers:
+            server.shutdown()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for the doctors' bulk approve/reject/cancel endpoint: per-id
+outcomes, and a 400 for appointment_ids that are not a list of integers
+Uses a throwaway SQLite database
+"""
+
+import sys
+import os
+import tempfile
+from datetime import date, time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bulk.db')}"
+
+def seed(app, db):
+    """A doctor with three pending appointments and one of another doctor's; returns (doctor id, their ids, other id)"""
+    from models.user import User
+    from models.appointment import Appointment
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        doctor = User(name='Doc', email='doc@example.com', password_hash='x', role='doctor',
+                      private_key='k', public_key='k', consultation_fee=500)
+        other = User(name='Other', email='other@example.com', password_hash='x', role='doctor',
+                     private_key='k', public_key='k', consultation_fee=500)
+        patient = User(name='Pat', email='pat@example.com', password_hash='x', role='patient',
+                       private_key='k', public_key='k')
+        db.session.add_all([doctor, other, patient])
+        db.session.commit()
+        mine = [Appointment(patient_id=patient.id, doctor_id=doctor.id, date=date.today(),
+                            time=time(9 + i, 0), status='pending') for i in range(3)]
+        theirs = Appointment(patient_id=patient.id, doctor_id=other.id, date=date.today(),
+                             time=time(15, 0), status='pending')
+        db.session.add_all(mine + [theirs])
+        db.session.commit()
+        return doctor.id, [appt.id for appt in mine], theirs.id
+
+def doctor_client(app, doctor_id):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = doctor_id
+        s['user_role'] = 'doctor'
+    return client
+
+def test_malformed_ids():
+    """Anything but a list of integers is a 400 and changes nothing"""
+    print("🔍 Testing malformed appointment_ids...")
+    from app import app, db
+    from models.appointment import Appointment
+
+    doctor_id, mine, _ = seed(app, db)
+    client = doctor_client(app, doctor_id)
+    # '123' used to be read digit by digit as ids 1, 2 and 3
+    for ids in ('123', ''.join(map(str, mine)), 5, [True], [1.5], ['1'], [None], {'1': 1}):
+        response = client.post('/appointments/bulk/approve', json={'appointment_ids': ids})
+        assert response.status_code == 400, (ids, response.status_code)
+    response = client.post('/appointments/bulk/approve', json=mine)
+    assert response.status_code == 400, 'a bare JSON list is not an object'
+    response = client.post('/appointments/bulk/approve', data={'appointment_ids': ['1', 'x']})
+    assert response.status_code == 400, 'form ids must be digits'
+    with app.app_context():
+        assert {appt.status for appt in Appointment.query.all()} == {'pending'}
+    print("✅ Strings, numbers, booleans, floats and mixed lists are rejected with 400")
+
+def test_bulk_outcomes():
+    """Own pending appointments change; other doctors' and unknown ids are reported, not touched"""
+    print("🔍 Testing bulk approve outcomes...")
+    from app import app, db
+    from models.appointment import Appointment
+
+    doctor_id, mine, theirs = seed(app, db)
+    client = doctor_client(app, doctor_id)
+    response = client.post('/appointments/bulk/approve', json={'appointment_ids': [mine[0], mine[1], theirs, 99999]})
+    assert response.status_code == 200, response.status_code
+    body = response.get_json()
+    results = {row['id']: row['outcome'] for row in body['results']}
+    assert results == {mine[0]: 'updated', mine[1]: 'updated', theirs: 'unauthorized', 99999: 'not_found'}, results
+    assert body['updated'] == 2
+
+    response = client.post('/appointments/bulk/cancel', data={'appointment_ids': [str(mine[2])], 'remarks': 'away'})
+    assert response.status_code == 200, response.status_code
+    with app.app_context():
+        statuses = {appt.id: appt.status for appt in Appointment.query.all()}
+    assert statuses == {mine[0]: 'approved', mine[1]: 'approved', mine[2]: 'cancelled', theirs: 'pending'}, statuses
+    print("✅ JSON and form posts apply to the doctor's own appointments only")
+
+if __name__ == '__main__':
+    test_malformed_ids()
+    test_bulk_outcomes()
+    print("🎉 Bulk appointment actions test completed successfully!")
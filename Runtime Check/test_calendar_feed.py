@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for the iCalendar feed validators: a repeat request gets a 304,
+and renaming a user whose name is in the feed gives a fresh 200
+Uses a throwaway SQLite database
+"""
+
+import sys
+import os
+import time as clock
+import tempfile
+from datetime import date, time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'calendar.db')}"
+
+def seed(app, db):
+    """A patient with one appointment, plus an unrelated doctor; returns (patient id, doctor id, stranger id)"""
+    from models.user import User
+    from models.appointment import Appointment
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        doctor = User(name='Doc', email='doc@example.com', password_hash='x', role='doctor',
+                      private_key='k', public_key='k', consultation_fee=500)
+        stranger = User(name='Stranger', email='stranger@example.com', password_hash='x', role='doctor',
+                        private_key='k', public_key='k', consultation_fee=500)
+        patient = User(name='Pat', email='pat@example.com', password_hash='x', role='patient',
+                       private_key='k', public_key='k')
+        db.session.add_all([doctor, stranger, patient])
+        db.session.commit()
+        db.session.add(Appointment(patient_id=patient.id, doctor_id=doctor.id, date=date.today(),
+                                   time=time(9, 0), status='approved'))
+        db.session.commit()
+        return patient.id, doctor.id, stranger.id
+
+def rename(app, db, user_id, name):
+    from models.user import User
+
+    # Last-Modified has whole-second resolution
+    clock.sleep(1.1)
+    with app.app_context():
+        db.session.get(User, user_id).name = name
+        db.session.commit()
+
+def test_feed_validators():
+    """Renaming the counterpart changes both validators; renaming anyone else does not"""
+    print("🔍 Testing calendar feed validators...")
+    from app import app, db, calendar_feed_token
+
+    patient_id, doctor_id, stranger_id = seed(app, db)
+    with app.test_request_context():
+        url = f'/calendar/{calendar_feed_token(patient_id)}.ics'
+    client = app.test_client()
+
+    first = client.get(url)
+    assert first.status_code == 200 and b'Dr. Doc' in first.data, first.status_code
+    etag, last_modified = first.headers['ETag'], first.headers['Last-Modified']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    rename(app, db, stranger_id, 'Someone Else')
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304, 'an unrelated user does not matter'
+
+    rename(app, db, doctor_id, 'Renamed')
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200 and b'Dr. Renamed' in response.data, response.status_code
+    response = client.get(url, headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 200, 'clients that only send If-Modified-Since see the rename too'
+    print("✅ 304 until the doctor is renamed, then 200 with the new name")
+
+if __name__ == '__main__':
+    test_feed_validators()
+    print("🎉 Calendar feed test completed successfully!")
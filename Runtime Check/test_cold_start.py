@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget check
+Fails when importing app in a fresh interpreter gets slower than the budget,
+or when a module that is supposed to load lazily is imported eagerly again.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profile_imports import measure_import, total_import_ms, package_totals
+
+# Milliseconds for `import app`, fastest of RUNS; override with COLD_START_BUDGET_MS
+BUDGET_MS = float(os.environ.get('COLD_START_BUDGET_MS', 1000))
+RUNS = 3
+# Only needed by specific routes, so they must not load at import
+LAZY_MODULES = ['numpy', 'requests', 'cryptography']
+
+def test_cold_start():
+    print("🔍 Measuring cold import of app...")
+    # In-memory SQLite keeps the database driver out of the measurement
+    env = dict(os.environ, DATABASE_URL=os.environ.get('COLD_START_DATABASE_URL', 'sqlite://'))
+    runs = [measure_import('app', env) for _ in range(RUNS)]
+    rows, loaded = min(runs, key=lambda run: total_import_ms(run[0]))
+    elapsed = total_import_ms(rows)
+
+    print(f"import app: {elapsed:.1f} ms (budget {BUDGET_MS:.0f} ms)")
+    for package, self_us in package_totals(rows)[:5]:
+        print(f"  - {package}: {self_us / 1000:.1f} ms")
+
+    eager = [module for module in LAZY_MODULES if module in loaded]
+    assert not eager, f"imported at startup but should be lazy: {', '.join(eager)}"
+    print("✅ Heavy modules stay lazy")
+
+    assert elapsed <= BUDGET_MS, f"cold start {elapsed:.1f} ms is over the {BUDGET_MS:.0f} ms budget"
+    print("✅ Cold start within budget")
+
+if __name__ == '__main__':
+    try:
+        test_cold_start()
+        print("🎉 Cold start check completed successfully!")
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+eSewa status check against a scripted stub session: gateway errors are retried
+with jittered backoff, read timeouts are not, the whole call stays within
+STATUS_DEADLINE, and the circuit breaker opens, lets one trial through when
+half-open and closes again on success
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.esewa as esewa_module
+from requests.exceptions import ConnectionError, ReadTimeout
+from utils.esewa import CircuitBreaker, ESewaPayment
+
+class StubResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body or {}
+        self.text = str(self.body)
+
+    def json(self):
+        return self.body
+
+class StubSession:
+    """Plays back outcomes in order: a StubResponse is returned, an exception raised"""
+    def __init__(self, *outcomes, delay=0):
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.calls = []  # (monotonic time, timeout) per get()
+
+    def get(self, url, timeout):
+        self.calls.append((time.monotonic(), timeout))
+        time.sleep(self.delay)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+class StubbedESewa(ESewaPayment):
+    def __init__(self, session, breaker=None):
+        super().__init__()
+        self.stub = session
+        self.circuit_breaker = breaker or CircuitBreaker()
+
+    @property
+    def session(self):
+        return self.stub
+
+COMPLETE = StubResponse(200, {'status': 'COMPLETE', 'ref_id': 'REF1'})
+
+def check(esewa):
+    return esewa.check_transaction_status('txn-1', '565')
+
+def test_gateway_errors_retried_with_backoff():
+    print("🔍 Gateway errors are retried with jittered, growing backoff...")
+    session = StubSession(StubResponse(503), ConnectionError('reset'), COMPLETE)
+    esewa = StubbedESewa(session)
+    assert check(esewa)['status'] == 'COMPLETE'
+    assert len(session.calls) == esewa_module.MAX_RETRIES + 1
+    gaps = [b[0] - a[0] for a, b in zip(session.calls, session.calls[1:])]
+    for attempt, gap in enumerate(gaps, start=1):
+        assert gap <= esewa_module.RETRY_BACKOFF * 2 ** (attempt - 1) + 0.05, (attempt, gap)
+    assert all(t[0] <= esewa_module.CONNECT_TIMEOUT and t[1] <= esewa_module.READ_TIMEOUT for _, t in session.calls)
+    assert esewa.circuit_breaker.failures == 0
+    print(f"✅ Succeeded on attempt {len(session.calls)}, backoff gaps {[round(g, 2) for g in gaps]}s")
+
+def test_read_timeout_not_retried():
+    print("🔍 Read timeouts end the call at once...")
+    session = StubSession(ReadTimeout('slow'), COMPLETE)
+    esewa = StubbedESewa(session)
+    assert 'error' in check(esewa)
+    assert len(session.calls) == 1, session.calls
+    assert esewa.circuit_breaker.failures == 1
+    print("✅ One attempt, counted as one breaker failure")
+
+def test_deadline_across_attempts():
+    print("🔍 Retries stop at STATUS_DEADLINE...")
+    deadline, esewa_module.STATUS_DEADLINE = esewa_module.STATUS_DEADLINE, 0.5
+    connect, esewa_module.CONNECT_TIMEOUT = esewa_module.CONNECT_TIMEOUT, 0.1
+    try:
+        session = StubSession(*[ConnectionError('refused')] * 3, delay=0.3)
+        started = time.monotonic()
+        assert 'error' in check(StubbedESewa(session))
+        elapsed = time.monotonic() - started
+    finally:
+        esewa_module.STATUS_DEADLINE = deadline
+        esewa_module.CONNECT_TIMEOUT = connect
+    assert len(session.calls) < 3, session.calls
+    assert elapsed < 0.5 + 0.3, elapsed
+    print(f"✅ {len(session.calls)} attempts in {elapsed:.2f}s against a 0.5s deadline")
+
+def test_circuit_breaker_states():
+    print("🔍 Circuit breaker opens, goes half-open and closes...")
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    failing = StubSession(*[StubResponse(503)] * 6)
+    esewa = StubbedESewa(failing, breaker)
+    check(esewa)
+    assert not breaker.is_open
+    check(esewa)
+    assert breaker.is_open, 'opens after failure_threshold failed calls'
+
+    calls = len(failing.calls)
+    assert 'circuit open' in check(esewa)['error']
+    assert len(failing.calls) == calls, 'an open breaker makes no request'
+
+    time.sleep(0.25)
+    assert breaker.allow_request(), 'half-open lets one trial through'
+    assert not breaker.allow_request(), 'and only one'
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow_request(), 'a failed trial reopens it'
+
+    time.sleep(0.25)
+    esewa.stub = StubSession(COMPLETE)
+    assert check(esewa)['status'] == 'COMPLETE'
+    assert not breaker.is_open and breaker.failures == 0, 'a successful trial closes it'
+    print("✅ closed -> open -> half-open -> open -> half-open -> closed")
+
+if __name__ == '__main__':
+    test_gateway_errors_retried_with_backoff()
+    test_read_timeout_not_retried()
+    test_deadline_across_attempts()
+    test_circuit_breaker_states()
+    print("🎉 eSewa status retry check completed successfully!")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+/metrics under gunicorn with several workers: request counts and SQL statement
+counts must cover every worker, whichever one answers the scrape, and survive a
+HUP reload while a previous run's files are dropped at startup. Also checks,
+in process, that admission gauges move while requests hold or wait for a slot
+and that an async view that raises is counted as a 500
+Starts gunicorn on a throwaway SQLite database unless DATABASE_URL is set
+"""
+
+import sys
+import os
+import re
+import time
+import signal
+import socket
+import tempfile
+import subprocess
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+WORKERS = int(os.environ.get('BENCH_WORKERS', 3))
+REQUESTS = int(os.environ.get('BENCH_REQUESTS', 30))
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_gunicorn(port, metrics_dir=None):
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(WORKERS), GUNICORN_THREADS='1',
+               PROMETHEUS_MULTIPROC_DIR=metrics_dir or tempfile.mkdtemp())
+    env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'metrics.db')}")
+    process = subprocess.Popen(['gunicorn', '--config', 'gunicorn.conf.py', 'wsgi:app'], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    import requests
+    for _ in range(100):
+        try:
+            requests.get(f'http://127.0.0.1:{port}/login', timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('gunicorn did not start')
+
+def sample(text, name, **labels):
+    """Sum of the samples of name whose labels include the given ones"""
+    total = 0.0
+    for line in text.splitlines():
+        match = re.match(rf'{name}(?:{{(.*)}})? (\S+)$', line)
+        if not match:
+            continue
+        found = dict(re.findall(r'(\w+)="([^"]*)"', match.group(1) or ''))
+        if all(found.get(k) == v for k, v in labels.items()):
+            total += float(match.group(2))
+    return total
+
+def test_metrics_across_workers():
+    import requests
+
+    print(f"🔍 Scraping /metrics from {WORKERS} gunicorn workers...")
+    port = free_port()
+    process = start_gunicorn(port)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        # A fresh connection per request, so the requests spread over the workers
+        for _ in range(REQUESTS):
+            requests.get(f'{base_url}/login')
+        for i in range(REQUESTS):
+            requests.post(f'{base_url}/login', data={'email': f'nobody{i}@bench', 'password': 'x'})
+
+        scrapes = [requests.get(f'{base_url}/metrics').text for _ in range(WORKERS * 2)]
+        for text in scrapes:
+            # The startup probe adds one GET
+            gets = sample(text, 'http_requests_total', endpoint='login', method='GET', status='200')
+            posts = sample(text, 'http_requests_total', endpoint='login', method='POST', status='200')
+            assert gets == REQUESTS + 1, gets
+            assert posts == REQUESTS, posts
+            assert sample(text, 'http_request_duration_seconds_count', endpoint='login') == REQUESTS * 2 + 1
+            assert sample(text, 'db_statements_total', endpoint='login') >= REQUESTS
+        print(f"✅ Every scrape counted {REQUESTS * 2 + 1} /login requests and their SQL statements")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+def test_counts_survive_reload():
+    import requests
+
+    print("🔍 Counts across a HUP reload...")
+    metrics_dir = tempfile.mkdtemp()
+    stale = os.path.join(metrics_dir, 'counter_1.db')
+    with open(stale, 'wb') as f:
+        f.write(b'left over from a previous run')
+    port = free_port()
+    process = start_gunicorn(port, metrics_dir)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        assert not os.path.exists(stale), 'files from a previous run are dropped at startup'
+        for _ in range(REQUESTS):
+            requests.get(f'{base_url}/login')
+        # HUP reads gunicorn.conf.py again and replaces every worker
+        process.send_signal(signal.SIGHUP)
+        for _ in range(REQUESTS):
+            requests.get(f'{base_url}/login')
+        text = requests.get(f'{base_url}/metrics').text
+        gets = sample(text, 'http_requests_total', endpoint='login', method='GET', status='200')
+        # The startup probe adds one GET
+        assert gets == REQUESTS * 2 + 1, gets
+        print(f"✅ Stale file dropped at startup, {int(gets)} /login requests counted across the reload")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+def test_live_gauges():
+    import threading
+    from prometheus_client import REGISTRY
+    from utils.admission import AdmissionClass
+
+    print("🔍 Admission gauges while no request completes...")
+    admission = AdmissionClass('gauge-check', concurrency=1, queue=1, queue_timeout=5,
+                               user_rate=100, user_burst=100, global_rate=100, global_burst=100)
+    labels = {'admission_class': 'gauge-check'}
+    held = admission.acquire('user:1')
+    queued = threading.Thread(target=lambda: admission.release(admission.acquire('user:2')))
+    queued.start()
+    deadline = time.monotonic() + 5
+    while REGISTRY.get_sample_value('admission_queued', labels) != 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert REGISTRY.get_sample_value('admission_in_flight', labels) == 1
+    assert REGISTRY.get_sample_value('admission_queued', labels) == 1
+    admission.release(held)
+    queued.join()
+    assert REGISTRY.get_sample_value('admission_in_flight', labels) == 0
+    assert REGISTRY.get_sample_value('admission_queued', labels) == 0
+    print("✅ In-flight and queued gauges follow acquire and release")
+
+def test_async_view_errors():
+    import asyncio
+    import httpx
+    from prometheus_client import REGISTRY
+    from utils.asgi import AsgiDispatcher
+    from utils.metrics import REQUESTS_IN_PROGRESS, observe_request
+
+    print("🔍 An async view that raises is counted as a 500...")
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'metrics.db')}")
+    from app import create_app
+
+    async def broken_view(request):
+        raise RuntimeError('boom')
+
+    dispatcher = AsgiDispatcher(create_app(), [('/broken-async', broken_view, ['GET'])],
+                                observe=observe_request, in_progress=REQUESTS_IN_PROGRESS)
+    labels = {'endpoint': 'broken_view', 'method': 'GET', 'status': '500'}
+    before = REGISTRY.get_sample_value('http_requests_total', labels) or 0
+
+    async def call():
+        transport = httpx.ASGITransport(app=dispatcher)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            try:
+                await client.get('/broken-async')
+                raise AssertionError('the view error should propagate to the server')
+            except RuntimeError:
+                pass
+    asyncio.run(call())
+    assert REGISTRY.get_sample_value('http_requests_total', labels) == before + 1
+    assert REGISTRY.get_sample_value('http_requests_in_progress') == 0
+    print("✅ Counted as 500 and no longer in progress")
+
+if __name__ == '__main__':
+    test_live_gauges()
+    test_async_view_errors()
+    test_metrics_across_workers()
+    test_counts_survive_reload()
+    print("🎉 Multi-worker metrics check completed successfully!")
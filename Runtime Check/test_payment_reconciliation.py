@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Test script for the pending payment reconciliation worker (including a payment
+completed for a cancelled appointment), for a success callback that lands after
+a reconciliation pass, and for status polls racing each other on one payment
+Runs against a local stand-in for eSewa's status API and a throwaway SQLite database
+"""
+
+import sys
+import os
+import json
+import base64
+import hmac
+import hashlib
+import tempfile
+import threading
+from datetime import datetime, date, time, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'reconcile.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+# transaction_uuid -> status the stand-in gateway reports
+GATEWAY_STATUSES = {
+    'txn-complete': 'COMPLETE',
+    'txn-pending': 'PENDING',
+    'txn-canceled': 'CANCELED',
+    'txn-missing': 'NOT_FOUND',
+    'txn-paid-cancelled': 'COMPLETE',
+}
+
+class StatusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        transaction_uuid = params.get('transaction_uuid', [''])[0]
+        if transaction_uuid == 'txn-broken':
+            self.send_response(500)
+            self.end_headers()
+            self.wfile.write(b'gateway error')
+            return
+        body = json.dumps({
+            'product_code': params.get('product_code', [''])[0],
+            'transaction_uuid': transaction_uuid,
+            'total_amount': params.get('total_amount', [''])[0],
+            'status': GATEWAY_STATUSES.get(transaction_uuid, 'NOT_FOUND'),
+            'ref_id': f'REF-{transaction_uuid}'
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_gateway():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StatusHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def test_reconcile_pending_payments():
+    """Pending payments are resolved from the stand-in gateway in bulk"""
+    print("🔍 Testing payment reconciliation against local gateway...")
+
+    from app import app, db
+    from models.user import User
+    from models.appointment import Appointment
+    from models.payment import Payment
+    from utils.esewa import ESewaPayment
+    from utils.reconcile import reconcile_pending_payments
+
+    server = start_gateway()
+    try:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            doctor = User(name='Doc', email='doc@example.com', password_hash='x', role='doctor',
+                          private_key='k', public_key='k', consultation_fee=500)
+            patient = User(name='Pat', email='pat@example.com', password_hash='x', role='patient',
+                           private_key='k', public_key='k')
+            db.session.add_all([doctor, patient])
+            db.session.commit()
+
+            old = datetime.utcnow() - timedelta(hours=1)
+            uuids = ['txn-complete', 'txn-pending', 'txn-canceled', 'txn-missing', 'txn-broken', 'txn-fresh']
+            for i, transaction_uuid in enumerate(uuids):
+                appt = Appointment(patient_id=patient.id, doctor_id=doctor.id, date=date.today(),
+                                   time=time(9 + i, 0), status='pending')
+                db.session.add(appt)
+                db.session.flush()
+                payment = Payment(appointment_id=appt.id, transaction_uuid=transaction_uuid,
+                                  amount=500, tax_amount=65, total_amount=565,
+                                  created_at=datetime.utcnow() if transaction_uuid == 'txn-fresh' else old)
+                db.session.add(payment)
+                db.session.flush()
+                appt.payment_id, appt.payment_status = payment.id, 'pending'
+            db.session.commit()
+
+            esewa = ESewaPayment()
+            esewa.status_check_test_url = f'http://127.0.0.1:{server.server_port}/api/epay/transaction/status/'
+            totals = reconcile_pending_payments(db, Payment, Appointment, esewa, batch_size=2, max_workers=4)
+            print(f"Totals: {totals}")
+
+            statuses = {p.transaction_uuid: p.status for p in Payment.query.all()}
+            expected = {
+                'txn-complete': 'completed',
+                'txn-pending': 'pending',
+                'txn-canceled': 'cancelled',
+                'txn-missing': 'failed',
+                'txn-broken': 'pending',
+                'txn-fresh': 'pending',
+            }
+            assert statuses == expected, statuses
+            # Appointments mirror their current payment's status
+            current = {p.transaction_uuid: p.appointment.payment_status for p in Payment.query.all()}
+            assert current == expected, current
+            assert totals['checked'] == 5, totals
+
+            paid = Payment.query.filter_by(transaction_uuid='txn-complete').first()
+            assert paid.esewa_ref_id == 'REF-txn-complete'
+            assert paid.appointment.status == 'approved'
+            unpaid = Payment.query.filter_by(transaction_uuid='txn-pending').first()
+            assert unpaid.appointment.status == 'pending'
+            print("✅ Pending payments reconciled correctly")
+    finally:
+        server.shutdown()
+
+def test_completed_for_cancelled_appointment():
+    """A payment eSewa completed for an appointment cancelled meanwhile is flagged for refund, not attached"""
+    print("🔍 Testing reconciliation of a payment whose appointment was cancelled...")
+
+    from app import app, db
+    from models.appointment import Appointment
+    from models.payment import Payment
+    from utils.esewa import ESewaPayment
+    from utils.reconcile import reconcile_pending_payments
+
+    server = start_gateway()
+    try:
+        with app.app_context():
+            template = Appointment.query.first()
+            appt = Appointment(patient_id=template.patient_id, doctor_id=template.doctor_id, date=date.today(),
+                               time=time(19, 0), status='cancelled', cancellation_remarks='Doctor day off')
+            db.session.add(appt)
+            db.session.flush()
+            db.session.add(Payment(appointment_id=appt.id, transaction_uuid='txn-paid-cancelled',
+                                   amount=500, tax_amount=65, total_amount=565,
+                                   created_at=datetime.utcnow() - timedelta(hours=1)))
+            db.session.commit()
+
+            esewa = ESewaPayment()
+            esewa.status_check_test_url = f'http://127.0.0.1:{server.server_port}/api/epay/transaction/status/'
+            reconcile_pending_payments(db, Payment, Appointment, esewa)
+
+            payment = Payment.query.filter_by(transaction_uuid='txn-paid-cancelled').one()
+            appointment = db.session.get(Appointment, appt.id)
+            assert payment.status == 'completed', payment.status
+            assert payment.refund_status == 'pending', payment.refund_status
+            assert appointment.status == 'cancelled', appointment.status
+            assert appointment.payment_id is None and appointment.payment_status is None
+            paid = Payment.query.filter_by(transaction_uuid='txn-complete').one()
+            assert paid.refund_status is None and paid.appointment.payment_id == paid.id
+            print("✅ The cancelled appointment stayed cancelled and its payment was flagged for refund")
+    finally:
+        server.shutdown()
+
+def signed_callback(esewa, transaction_uuid, total_amount):
+    """Base64 success callback payload signed the way eSewa signs it"""
+    data = {
+        'transaction_code': 'CODE-LATE', 'status': 'COMPLETE', 'total_amount': total_amount,
+        'transaction_uuid': transaction_uuid, 'product_code': esewa.product_code,
+        'signed_field_names': 'transaction_code,status,total_amount,transaction_uuid,product_code,signed_field_names',
+    }
+    message = ','.join(f'{field}={data[field]}' for field in data['signed_field_names'].split(','))
+    digest = hmac.new(esewa.secret_key.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).digest()
+    data['signature'] = base64.b64encode(digest).decode('utf-8')
+    return base64.b64encode(json.dumps(data).encode('utf-8')).decode('utf-8')
+
+def test_callback_after_reconciliation():
+    """A payment eSewa does not know yet stays pending while the patient may still be paying"""
+    print("🔍 Testing a success callback that lands after a reconciliation pass...")
+
+    from app import app, db
+    from models.appointment import Appointment
+    from models.payment import Payment
+    from utils.esewa import ESewaPayment
+    from utils.reconcile import reconcile_pending_payments
+
+    server = start_gateway()
+    try:
+        with app.app_context():
+            patient_id = Appointment.query.first().patient_id
+            doctor_id = Appointment.query.first().doctor_id
+            appt = Appointment(patient_id=patient_id, doctor_id=doctor_id, date=date.today(),
+                               time=time(18, 0), status='pending')
+            db.session.add(appt)
+            db.session.flush()
+            # Older than the reconciler's min_age, younger than the reuse window
+            db.session.add(Payment(appointment_id=appt.id, transaction_uuid='txn-late-callback',
+                                   amount=500, tax_amount=65, total_amount=565,
+                                   created_at=datetime.utcnow() - timedelta(minutes=10)))
+            db.session.commit()
+
+            esewa = ESewaPayment()
+            esewa.status_check_test_url = f'http://127.0.0.1:{server.server_port}/api/epay/transaction/status/'
+            reconcile_pending_payments(db, Payment, Appointment, esewa)
+            payment = Payment.query.filter_by(transaction_uuid='txn-late-callback').one()
+            assert payment.status == 'pending', payment.status
+            assert Payment.query.filter_by(transaction_uuid='txn-missing').one().status == 'failed'
+            appointment_id = appt.id
+
+        response = app.test_client().get('/payment/success', query_string={
+            'data': signed_callback(ESewaPayment(), 'txn-late-callback', '565')
+        })
+        assert response.status_code == 200, response.status_code
+        assert b'no longer pending' not in response.data
+        with app.app_context():
+            assert Payment.query.filter_by(transaction_uuid='txn-late-callback').one().status == 'completed'
+            assert db.session.get(Appointment, appointment_id).status == 'approved'
+        print("✅ NOT_FOUND stayed pending inside the reuse window and the late callback completed it")
+    finally:
+        server.shutdown()
+
+def test_stale_status_poll():
+    """Two pollers that read the same pending payment apply its transition once"""
+    print("🔍 Testing concurrent status polls on one payment...")
+
+    from app import app, db, record_esewa_status
+    from models.appointment import Appointment
+    from models.payment import Payment
+    from models.payment_rollup import PaymentDailyRollup
+
+    def rollup_counts():
+        return {r.status: r.payment_count for r in PaymentDailyRollup.query.all()}
+
+    with app.app_context():
+        appt = Appointment.query.first()
+        payment = Payment(appointment_id=appt.id, transaction_uuid='txn-race',
+                          amount=500, tax_amount=65, total_amount=565)
+        db.session.add(payment)
+        db.session.commit()
+        before = rollup_counts()
+
+        # Each app context has its own session, like two requests polling at once
+        first = Payment.query.filter_by(transaction_uuid='txn-race').one()
+        with app.app_context():
+            second = Payment.query.filter_by(transaction_uuid='txn-race').one()
+            assert first.status == second.status == 'pending'
+            record_esewa_status(second, {'status': 'CANCELED', 'ref_id': 'REF-second'})
+        record_esewa_status(first, {'status': 'CANCELED', 'ref_id': 'REF-first'})
+
+        after = rollup_counts()
+        payment = Payment.query.filter_by(transaction_uuid='txn-race').one()
+        assert payment.status == 'cancelled' and payment.esewa_ref_id == 'REF-second', payment.esewa_ref_id
+        assert after.get('cancelled', 0) - before.get('cancelled', 0) == 1, (before, after)
+        assert after.get('pending', 0) - before.get('pending', 0) == -1, (before, after)
+        print("✅ The stale poller wrote nothing and the rollups moved once")
+
+if __name__ == '__main__':
+    test_reconcile_pending_payments()
+    test_completed_for_cancelled_appointment()
+    test_callback_after_reconciliation()
+    test_stale_status_poll()
+    print("🎉 Reconciliation test completed successfully!")
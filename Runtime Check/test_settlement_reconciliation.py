@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script for the settlement statement import and reconciliation
+Loads a small statement CSV (with eSewa's own header spellings) into the
+staging table and checks matched, missing and amount-mismatch results, plus the
+CSV stream the PostgreSQL COPY path reads from
+Uses a throwaway SQLite database
+"""
+
+import sys
+import os
+import csv
+import io
+import uuid
+import tempfile
+from datetime import datetime, date, time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TMP_DIR, 'settlement.db')}"
+
+STATEMENT = """Transaction UUID,Ref ID,Amount,Status,Settlement Date
+txn-ok,REF-OK,565.00,COMPLETE,2026-10-18 10:00:00
+txn-mismatch,REF-MISMATCH,"1,565.00",COMPLETE,2026-10-18 11:00:00
+txn-drift,REF-DRIFT,565.00,COMPLETE,2026-10-18 12:00:00
+,REF-BYREF,565.00,COMPLETE,2026-10-18 13:00:00
+txn-unknown,REF-UNKNOWN,565.00,COMPLETE,2026-10-18 14:00:00
+
+txn-late,REF-LATE,565.00,COMPLETE,18/10/2026 18:00:00
+"""
+
+# transaction_uuid -> (status, esewa_ref_id); txn-unsettled is paid but not on the statement
+PAYMENTS = {
+    'txn-ok': ('completed', 'REF-OK'),
+    'txn-mismatch': ('completed', 'REF-MISMATCH'),
+    'txn-drift': ('pending', None),
+    'txn-byref': ('completed', 'REF-BYREF'),
+    'txn-late': ('completed', 'REF-LATE'),
+    'txn-unsettled': ('completed', 'REF-UNSETTLED'),
+}
+
+def seed(app, db):
+    from models.user import User
+    from models.appointment import Appointment
+    from models.payment import Payment
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        doctor = User(name='Doc', email='doc@example.com', password_hash='x', role='doctor',
+                      private_key='k', public_key='k', consultation_fee=500)
+        patient = User(name='Pat', email='pat@example.com', password_hash='x', role='patient',
+                       private_key='k', public_key='k')
+        db.session.add_all([doctor, patient])
+        db.session.commit()
+        paid_at = datetime(2026, 10, 18, 15, 0)
+        for i, (transaction_uuid, (status, ref_id)) in enumerate(PAYMENTS.items()):
+            appt = Appointment(patient_id=patient.id, doctor_id=doctor.id, date=date.today(),
+                               time=time(9 + i, 0), status='approved')
+            db.session.add(appt)
+            db.session.flush()
+            db.session.add(Payment(appointment_id=appt.id, transaction_uuid=transaction_uuid, status=status,
+                                   esewa_ref_id=ref_id, amount=500, tax_amount=65, total_amount=565,
+                                   created_at=paid_at, updated_at=paid_at))
+        db.session.commit()
+
+def test_settlement_reconciliation():
+    """Statement rows are staged, matched by uuid or ref_id, and every issue is reported once"""
+    print("🔍 Testing settlement import and reconciliation...")
+
+    from app import app, db
+    from models.settlement import SettlementStaging
+    from utils.settlement import load_statement, reconcile_statement, drop_batch
+
+    seed(app, db)
+    path = os.path.join(TMP_DIR, 'statement.csv')
+    with open(path, 'w', newline='') as f:
+        f.write(STATEMENT)
+
+    batch_id = uuid.uuid4().hex
+    with app.app_context():
+        loaded = load_statement(db, SettlementStaging, path, batch_id, chunk_size=2)
+        assert loaded == 6, loaded
+        assert SettlementStaging.query.filter_by(batch_id=batch_id).count() == 6
+
+        issues = {}
+        for row in reconcile_statement(db, SettlementStaging, batch_id):
+            key = row['transaction_uuid'] or row['ref_id']
+            assert key not in issues, f'{key} reported twice'
+            issues[key] = row
+        print(f"Issues: { {key: row['issue'] for key, row in issues.items()} }")
+
+        assert {key: row['issue'] for key, row in issues.items()} == {
+            'txn-mismatch': 'amount_mismatch',
+            'txn-drift': 'status_drift',
+            'txn-unknown': 'missing_payment',
+            'txn-unsettled': 'missing_settlement',
+        }, issues
+        assert issues['txn-mismatch']['statement_amount'] == 1565.0
+        assert issues['txn-mismatch']['payment_amount'] == 565.0
+        assert issues['txn-unknown']['payment_id'] is None
+        # txn-ok matched by uuid, the blank-uuid row matched txn-byref by ref_id, txn-late by its d/m/Y date
+
+        drop_batch(db, SettlementStaging, batch_id)
+        assert SettlementStaging.query.filter_by(batch_id=batch_id).count() == 0
+    print("✅ Matched rows pass, mismatch, drift and both kinds of missing row are reported")
+
+def test_copy_stream():
+    """The CSV fed to COPY on PostgreSQL has one row per statement line, in staging column order"""
+    print("🔍 Testing the COPY stream...")
+    from utils.settlement import CopyStream, read_statement, STAGING_COLUMNS
+
+    path = os.path.join(TMP_DIR, 'statement.csv')
+    stream = CopyStream(read_statement(path, 'batch'))
+    chunks = []
+    while True:
+        chunk = stream.read(16)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    rows = list(csv.reader(io.StringIO(''.join(chunks))))
+    assert stream.count == len(rows) == 6, (stream.count, len(rows))
+    assert all(len(row) == len(STAGING_COLUMNS) for row in rows)
+    assert rows[1] == ['batch', 'txn-mismatch', 'REF-MISMATCH', '1565.0', 'COMPLETE', '2026-10-18 11:00:00'], rows[1]
+    assert rows[3][1] == '', 'a blank uuid is NULL for COPY'
+    print(f"✅ {len(rows)} rows streamed in {len(chunks)} small reads")
+
+if __name__ == '__main__':
+    test_settlement_reconciliation()
+    test_copy_stream()
+    print("🎉 Settlement reconciliation test completed successfully!")
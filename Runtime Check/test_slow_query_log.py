@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Slow-query log: off by default; when on, slow statements are written with
+their route and redacted parameters, SELECTs get a sampled plan, writes are
+never explained, and a slow log destination does not slow requests down
+Uses a throwaway SQLite database unless DATABASE_URL is set
+"""
+
+import sys
+import os
+import io
+import json
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'slow_queries.db')}"
+
+SECRET_EMAIL = 'very-private-patient@example.np'
+
+class SlowStream(io.StringIO):
+    """Log destination that takes delay seconds per write"""
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return super().write(text)
+
+def make_app(**config):
+    from app import create_app, db
+    # Schema setup statements go to /dev/null until a test swaps in its own stream
+    app = create_app({'SQLALCHEMY_DATABASE_URI': os.environ['DATABASE_URL'], 'SLOW_QUERY_LOG_FILE': os.devnull, **config})
+    with app.app_context():
+        db.create_all()
+    return app
+
+def entries(log):
+    log.pending.join()
+    return [json.loads(line) for line in log.stream.getvalue().splitlines()]
+
+def test_disabled_by_default():
+    print("🔍 Slow-query log is opt-in...")
+    os.environ.pop('SLOW_QUERY_LOG', None)
+    app = make_app()
+    assert 'slow_query_log' not in app.extensions
+    print("✅ No listener unless SLOW_QUERY_LOG=1")
+
+def test_logged_statements():
+    print("🔍 Logged statements carry the route, redacted parameters and a plan...")
+    from sqlalchemy import text
+    from app import db
+
+    app = make_app(SLOW_QUERY_LOG=True, SLOW_QUERY_MS=0, SLOW_QUERY_EXPLAIN_RATE=1)
+    log = app.extensions['slow_query_log']
+    log.stream = io.StringIO()
+
+    app.test_client().post('/login', data={'email': SECRET_EMAIL, 'password': 'x'})
+    with app.app_context():
+        db.session.execute(text('UPDATE users SET name = name WHERE email = :email'), {'email': SECRET_EMAIL})
+        db.session.commit()
+
+    logged = entries(log)
+    raw = log.stream.getvalue()
+    assert SECRET_EMAIL not in raw, 'bound parameters must be redacted'
+
+    login = [e for e in logged if e.get('endpoint') == 'login' and 'users.email' in e['statement']]
+    assert login, logged
+    assert login[0]['method'] == 'POST' and login[0]['route'] == '/login'
+    assert '<str>' in json.dumps(login[0]['params'])
+    assert login[0].get('plan'), 'sampled SELECTs get a plan'
+
+    update = [e for e in logged if e['statement'].startswith('UPDATE users')]
+    assert update and 'plan' not in update[0], 'writes are never explained'
+    assert update[0]['endpoint'] is None and update[0]['thread']
+    print(f"✅ {len(logged)} statements logged, parameters redacted, plan: {login[0]['plan'][0]}")
+
+def test_logging_off_the_request_path():
+    print("🔍 A slow log destination does not slow requests...")
+    app = make_app(SLOW_QUERY_LOG=True, SLOW_QUERY_MS=0, SLOW_QUERY_EXPLAIN_RATE=1)
+    log = app.extensions['slow_query_log']
+    log.stream = SlowStream(delay=0.2)
+    client = app.test_client()
+
+    started = time.perf_counter()
+    for i in range(3):
+        client.post('/login', data={'email': f'user{i}@example.np', 'password': 'x'})
+    elapsed = time.perf_counter() - started
+    written = len(entries(log))
+    assert written >= 3, written
+    assert elapsed < 0.2 * written / 2, f'{elapsed:.2f}s for requests whose log writes take {0.2 * written:.1f}s'
+    print(f"✅ 3 requests in {elapsed * 1000:.0f}ms while {written} log writes took {0.2 * written:.1f}s in the background")
+
+if __name__ == '__main__':
+    test_disabled_by_default()
+    test_logged_statements()
+    test_logging_off_the_request_path()
+    print("🎉 Slow-query log check completed successfully!")
@@ -0,0 +1,12 @@
+"""
+ASGI entrypoint: payment status checks and file downloads are served async,
+everything else through the Flask app on ASGI_THREADS threads (default 4)
+Run with: uvicorn asgi:app --workers 4
+or: GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn --config gunicorn.conf.py asgi:app
+"""
+
+import os
+
+from app import app as flask_app, create_asgi_app
+
+app = create_asgi_app(flask_app, threads=int(os.environ.get('ASGI_THREADS', 4)))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Build fingerprinted, precompressed static assets
+Copies every file under static/ to static/dist/ with a content hash in its
+name, writes .gz and .br variants for text assets and a manifest that the app
+uses to rewrite url_for('static', ...) to the hashed names.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.assets import DIST_DIR, MANIFEST_NAME
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped without it
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map'}
+# Images and fonts are already compressed; a variant has to save at least this much to be kept
+MIN_SAVING = 0.05
+CSS_URL = re.compile(r"url\(\s*(['\"]?)(?!data:|https?:|//)([^'\")?#]+)([^'\")]*)\1\s*\)")
+
+def source_files(static_dir):
+    """Relative paths of every asset, skipping the build output"""
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.relpath(os.path.join(root, d), static_dir) != DIST_DIR)
+        for name in sorted(files):
+            yield os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, '/')
+
+def fingerprint(path, content):
+    base, ext = os.path.splitext(path)
+    return f"{base}.{hashlib.sha256(content).hexdigest()[:10]}{ext}"
+
+def rewrite_css_urls(path, content, manifest):
+    """Point url(...) references in a stylesheet at the hashed files"""
+    def replace(match):
+        quote, target, suffix = match.groups()
+        resolved = os.path.normpath(os.path.join(os.path.dirname(path), target)).replace(os.sep, '/')
+        if resolved not in manifest:
+            return match.group(0)
+        hashed = os.path.relpath(manifest[resolved], os.path.dirname(path) or '.').replace(os.sep, '/')
+        return f"url({quote}{hashed}{suffix}{quote})"
+    return CSS_URL.sub(replace, content.decode('utf-8')).encode('utf-8')
+
+def write_variants(target, content):
+    """Write .gz and .br next to target when they are worth serving; returns the suffixes written"""
+    written = []
+    variants = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda data: brotli.compress(data, quality=11)))
+    for suffix, compress in variants:
+        compressed = compress(content)
+        if len(compressed) <= len(content) * (1 - MIN_SAVING):
+            with open(target + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(suffix)
+    return written
+
+def build(static_dir=STATIC_DIR):
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    shutil.rmtree(dist_dir, ignore_errors=True)
+
+    paths = list(source_files(static_dir))
+    # Stylesheets last, so the files they reference are already hashed
+    paths.sort(key=lambda p: p.endswith('.css'))
+    manifest = {}
+    for path in paths:
+        with open(os.path.join(static_dir, path), 'rb') as f:
+            content = f.read()
+        if path.endswith('.css'):
+            content = rewrite_css_urls(path, content, manifest)
+        hashed = fingerprint(path, content)
+        manifest[path] = hashed
+
+        target = os.path.join(dist_dir, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(content)
+        variants = write_variants(target, content) if os.path.splitext(path)[1] in COMPRESSIBLE else []
+        print(f"  {path} -> {DIST_DIR}/{hashed} {' '.join(variants)}".rstrip())
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description='Fingerprint and precompress static assets')
+    parser.add_argument('--static-dir', default=STATIC_DIR)
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("⚠️  brotli is not installed, only gzip variants will be written")
+    manifest = build(args.static_dir)
+    print(f"✓ Built {len(manifest)} assets into {os.path.join(args.static_dir, DIST_DIR)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the eSewa ePay v2 gateway
+Serves the payment form endpoint (redirecting to success_url/failure_url with
+signed base64 data) and the transaction status API, so the payment flow can be
+exercised and load tested without the remote UAT service.
+
+Point the app at it with:
+    ESEWA_FORM_URL=http://127.0.0.1:9000/api/epay/main/v2/form
+    ESEWA_STATUS_URL=http://127.0.0.1:9000/api/epay/transaction/status/
+"""
+
+import argparse
+import base64
+import json
+import random
+import string
+import sys
+import os
+import threading
+import time
+from urllib.parse import urlencode
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, request, redirect, jsonify
+from utils.esewa import ESEWA_CONFIG, HMACSigner
+
+RESPONSE_SIGNED_FIELDS = 'transaction_code,status,total_amount,transaction_uuid,product_code,signed_field_names'
+REQUIRED_FIELDS = ['amount', 'tax_amount', 'total_amount', 'transaction_uuid', 'product_code',
+                   'success_url', 'failure_url', 'signed_field_names', 'signature']
+
+def create_simulator(secret_key=None, fail_ratio=0.0, latency_ms=0):
+    """Build the simulator app; transactions live in memory for the life of the process"""
+    sim = Flask(__name__)
+    signer = HMACSigner(secret_key or ESEWA_CONFIG['secret_key'])
+    transactions = {}
+    lock = threading.Lock()
+
+    def delay():
+        if latency_ms:
+            time.sleep(latency_ms / 1000.0)
+
+    def with_data(url, data):
+        data = dict(data, signed_field_names=RESPONSE_SIGNED_FIELDS)
+        data['signature'] = signer.sign(signer.build_message(data))
+        encoded = base64.b64encode(json.dumps(data).encode('utf-8')).decode('utf-8')
+        separator = '&' if '?' in url else '?'
+        return f"{url}{separator}{urlencode({'data': encoded})}"
+
+    @sim.route('/api/epay/main/v2/form', methods=['POST'])
+    def payment_form():
+        delay()
+        form = request.form
+        missing = [field for field in REQUIRED_FIELDS if not form.get(field)]
+        if missing:
+            return jsonify({'error_message': f"Missing fields: {', '.join(missing)}"}), 400
+        if not signer.verify(signer.build_message(form.to_dict()), form['signature']):
+            return jsonify({'error_message': 'Invalid payload signature.'}), 400
+
+        transaction_uuid = form['transaction_uuid']
+        failed = form.get('simulate') == 'failure' or random.random() < fail_ratio
+        record = {
+            'transaction_code': ''.join(random.choices(string.ascii_uppercase + string.digits, k=7)),
+            'status': 'CANCELED' if failed else 'COMPLETE',
+            'total_amount': form['total_amount'],
+            'transaction_uuid': transaction_uuid,
+            'product_code': form['product_code'],
+        }
+        with lock:
+            if transaction_uuid in transactions and transactions[transaction_uuid]['status'] == 'COMPLETE':
+                return jsonify({'error_message': 'Duplicate transaction.'}), 409
+            transactions[transaction_uuid] = record
+        return redirect(with_data(form['failure_url' if failed else 'success_url'], record))
+
+    @sim.route('/api/epay/transaction/status/')
+    def transaction_status():
+        delay()
+        transaction_uuid = request.args.get('transaction_uuid', '')
+        with lock:
+            record = transactions.get(transaction_uuid)
+        return jsonify({
+            'product_code': request.args.get('product_code'),
+            'transaction_uuid': transaction_uuid,
+            'total_amount': request.args.get('total_amount'),
+            'status': record['status'] if record else 'NOT_FOUND',
+            'ref_id': record['transaction_code'] if record else None,
+        })
+
+    return sim
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local eSewa gateway simulator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--fail-ratio', type=float, default=0.0, help='Share of payments that are cancelled')
+    parser.add_argument('--latency-ms', type=int, default=0, help='Artificial delay per gateway call')
+    args = parser.parse_args()
+
+    print(f"🚀 eSewa simulator on http://{args.host}:{args.port}")
+    print(f"   ESEWA_FORM_URL=http://{args.host}:{args.port}/api/epay/main/v2/form")
+    print(f"   ESEWA_STATUS_URL=http://{args.host}:{args.port}/api/epay/transaction/status/")
+    create_simulator(fail_ratio=args.fail_ratio, latency_ms=args.latency_ms).run(
+        host=args.host, port=args.port, threaded=True
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Gunicorn settings for the production server, overridable from the environment:
+    WEB_CONCURRENCY   worker processes (default 2 x CPUs + 1)
+    GUNICORN_THREADS  threads per worker (default 4; above 1 uses the gthread worker)
+    GUNICORN_PRELOAD  load the app in the master before forking (default 1)
+    GUNICORN_WORKER_CLASS  e.g. uvicorn.workers.UvicornWorker to serve asgi:app
+    PORT              listen port (default 5000)
+    PROMETHEUS_MULTIPROC_DIR  where workers write metrics for /metrics to merge
+                      (default <tmp>/securehealth-metrics, emptied at startup)
+"""
+
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync')
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then so slow leaks cannot build up
+max_requests = 2000
+max_requests_jitter = 200
+
+# prometheus_client picks multiprocess mode up at import, so this has to be
+# set before the app is loaded. This file is read again on every HUP, so
+# samples from a previous run are only dropped in on_starting.
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'securehealth-metrics'))
+os.makedirs(metrics_dir, exist_ok=True)
+
+accesslog = '-'
+errorlog = '-'
+
+def on_starting(server):
+    """Drop a previous run's metrics and create tables once in the master, before any worker exists"""
+    # A preloaded app has already opened the master's own files
+    own = f'_{os.getpid()}.db'
+    for stale in glob.glob(os.path.join(metrics_dir, '*.db')):
+        if not stale.endswith(own):
+            os.remove(stale)
+    from app import app, create_tables, db
+    create_tables(app)
+    # Workers must not inherit the master's pooled connections
+    with app.app_context():
+        db.engine.dispose()
+
+def post_fork(server, worker):
+    """Drop any connection state copied from the master without closing its sockets"""
+    from app import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+def child_exit(server, worker):
+    """Stop counting a dead worker's live gauges (requests in progress, admission queues)"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Import an eSewa settlement statement and reconcile it against the payments table
+Writes one CSV row per mismatched amount, missing row or status drift
+"""
+
+import argparse
+import csv
+import sys
+import os
+import time
+import uuid
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from models.settlement import SettlementStaging
+from utils.settlement import load_statement, reconcile_statement, drop_batch, RESULT_COLUMNS
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconcile an eSewa settlement CSV against payments')
+    parser.add_argument('statement', help='Settlement CSV exported from eSewa')
+    parser.add_argument('--output', default='settlement_issues.csv', help='Where to write the issues CSV')
+    parser.add_argument('--from', dest='window_start', help='Start of the statement period (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='window_end', help='End of the statement period (YYYY-MM-DD)')
+    parser.add_argument('--keep-staging', action='store_true', help='Keep the staged rows after reconciling')
+    args = parser.parse_args()
+
+    window_start = datetime.strptime(args.window_start, '%Y-%m-%d') if args.window_start else None
+    window_end = datetime.strptime(args.window_end, '%Y-%m-%d').replace(hour=23, minute=59, second=59) if args.window_end else None
+    batch_id = uuid.uuid4().hex
+
+    with app.app_context():
+        SettlementStaging.__table__.create(db.engine, checkfirst=True)
+        try:
+            started = time.time()
+            loaded = load_statement(db, SettlementStaging, args.statement, batch_id)
+            print(f"✓ Loaded {loaded} statement rows in {time.time() - started:.1f}s (batch {batch_id})")
+
+            started = time.time()
+            counts = {}
+            with open(args.output, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+                writer.writeheader()
+                for issue in reconcile_statement(db, SettlementStaging, batch_id, window_start, window_end):
+                    writer.writerow(issue)
+                    counts[issue['issue']] = counts.get(issue['issue'], 0) + 1
+            print(f"✓ Reconciled in {time.time() - started:.1f}s, issues written to {args.output}")
+            for issue, count in sorted(counts.items()):
+                print(f"  - {issue}: {count}")
+            if not counts:
+                print("  - no issues found")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Settlement reconciliation failed: {e}")
+            sys.exit(1)
+        finally:
+            if not args.keep_staging:
+                drop_batch(db, SettlementStaging, batch_id)
+
+if __name__ == '__main__':
+    main()
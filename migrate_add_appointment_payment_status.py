@@ -0,0 +1,22 @@
+from database import db
+from sqlalchemy import text
+from app import app
+
+with app.app_context():
+    db.session.execute(text('ALTER TABLE appointments ADD COLUMN IF NOT EXISTS payment_id INTEGER REFERENCES payments (id);'))
+    db.session.execute(text('ALTER TABLE appointments ADD COLUMN IF NOT EXISTS payment_status VARCHAR(20);'))
+    # Current payment: a completed one if any, otherwise the latest attempt
+    db.session.execute(text('''
+        UPDATE appointments a
+        SET payment_id = p.id, payment_status = p.status
+        FROM (
+            SELECT DISTINCT ON (appointment_id) id, appointment_id, status
+            FROM payments
+            ORDER BY appointment_id, (status = 'completed') DESC, created_at DESC, id DESC
+        ) p
+        WHERE p.appointment_id = a.id AND a.payment_id IS NULL;
+    '''))
+    db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_appointments_doctor_payment_status ON appointments (doctor_id, payment_status);'))
+    db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_appointments_patient_payment_status ON appointments (patient_id, payment_status);'))
+    db.session.commit()
+    print("Migration complete: payment_id and payment_status added to appointments and backfilled (if they did not exist).")
@@ -0,0 +1,8 @@
+from database import db
+from sqlalchemy import text
+from app import app
+
+with app.app_context():
+    db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_payments_appointment_status ON payments (appointment_id, status);'))
+    db.session.commit()
+    print("Migration complete: ix_payments_appointment_status index created (if it did not exist).")
@@ -0,0 +1,8 @@
+from database import db
+from sqlalchemy import text
+from app import app
+
+with app.app_context():
+    db.session.execute(text('ALTER TABLE payments ADD COLUMN IF NOT EXISTS refund_status VARCHAR(20);'))
+    db.session.commit()
+    print("Migration complete: refund_status column added (if it did not exist).")
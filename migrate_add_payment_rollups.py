@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the payment rollup table and backfill it from existing payments
+Safe to re-run: existing rollup rows are recomputed from the payments table
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app import app, db
+from models.payment_rollup import PaymentDailyRollup
+
+def migrate_add_payment_rollups():
+    """Create payment_daily_rollups and fill it from payments"""
+    with app.app_context():
+        try:
+            PaymentDailyRollup.__table__.create(db.engine, checkfirst=True)
+            print("✓ Payment rollup table created successfully!")
+
+            result = db.session.execute(text("""
+                INSERT INTO payment_daily_rollups
+                    (doctor_id, day, status, payment_count, amount, tax_amount, total_amount, updated_at)
+                SELECT a.doctor_id, CAST(p.created_at AS DATE), p.status, COUNT(*),
+                       SUM(p.amount), SUM(COALESCE(p.tax_amount, 0)), SUM(p.total_amount), NOW()
+                FROM payments p
+                JOIN appointments a ON a.id = p.appointment_id
+                GROUP BY a.doctor_id, CAST(p.created_at AS DATE), p.status
+                ON CONFLICT (doctor_id, day, status) DO UPDATE SET
+                    payment_count = EXCLUDED.payment_count,
+                    amount = EXCLUDED.amount,
+                    tax_amount = EXCLUDED.tax_amount,
+                    total_amount = EXCLUDED.total_amount,
+                    updated_at = EXCLUDED.updated_at
+            """))
+            db.session.commit()
+            print(f"✓ Backfilled {result.rowcount} rollup rows")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error creating payment rollups: {e}")
+            return False
+
+    return True
+
+if __name__ == "__main__":
+    print("Starting payment rollup migration...")
+    success = migrate_add_payment_rollups()
+    if success:
+        print("🎉 Payment rollup migration completed successfully!")
+    else:
+        print("💥 Payment rollup migration failed!")
+        sys.exit(1)
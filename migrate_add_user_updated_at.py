@@ -0,0 +1,9 @@
+from database import db
+from sqlalchemy import text
+from app import app
+
+with app.app_context():
+    db.session.execute(text('ALTER TABLE users ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;'))
+    db.session.execute(text('UPDATE users SET updated_at = created_at WHERE updated_at IS NULL;'))
+    db.session.commit()
+    print("Migration complete: updated_at column added to users (if it did not exist).")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Migration script to store file ids as native UUID columns
+Existing UUID4 strings are converted in place; new rows get time-ordered UUIDv7 ids
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app import app, db
+
+def migrate_native_uuid_keys():
+    """Convert files.id and appointment_files.id from VARCHAR(36) to UUID"""
+    with app.app_context():
+        try:
+            for table in ['files', 'appointment_files']:
+                data_type = db.session.execute(text(
+                    "SELECT data_type FROM information_schema.columns "
+                    "WHERE table_name = :table AND column_name = 'id'"
+                ), {'table': table}).scalar()
+                if data_type == 'uuid':
+                    print(f"✓ {table}.id is already UUID")
+                    continue
+                db.session.execute(text(f'ALTER TABLE {table} ALTER COLUMN id TYPE UUID USING id::uuid'))
+                print(f"✓ {table}.id converted to UUID")
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error converting id columns: {e}")
+            return False
+
+    return True
+
+if __name__ == "__main__":
+    print("Starting native UUID key migration...")
+    success = migrate_native_uuid_keys()
+    if success:
+        print("🎉 Native UUID key migration completed successfully!")
+    else:
+        print("💥 Native UUID key migration failed!")
+        sys.exit(1)
@@ -1,8 +1,16 @@
 from database import db
 from datetime import datetime, date, time
+from sqlalchemy import update
+
+# Appointments a completed payment may be attached to; a doctor may approve before the callback lands
+PAYABLE_STATUSES = ('pending', 'approved')
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
+    __table_args__ = (
+        db.Index('ix_appointments_doctor_payment_status', 'doctor_id', 'payment_status'),
+        db.Index('ix_appointments_patient_payment_status', 'patient_id', 'payment_status'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -12,11 +20,29 @@ class Appointment(db.Model):
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected, cancelled
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     cancellation_remarks = db.Column(db.Text)  # Remarks for cancellation or rejection
+    # Current payment, kept in step with Payment changes so listings need no payments join
+    payment_id = db.Column(db.Integer, db.ForeignKey('payments.id', use_alter=True, name='fk_appointments_payment_id'))
+    payment_status = db.Column(db.String(20))  # None, pending, completed, failed, cancelled
 
     # Relationships
     patient = db.relationship('User', foreign_keys=[patient_id], backref='appointments_as_patient')
     doctor = db.relationship('User', foreign_keys=[doctor_id], backref='appointments_as_doctor')
 
     def __repr__(self):
-        return f'<Appointment {self.id}>' 
\ No newline at end of file
+        return f'<Appointment {self.id}>'
+
+def set_current_payment_status(payment_ids, status):
+    """
+    Mirror a payment status change onto the appointments whose current payment it is.
+    Runs in the caller's transaction; the caller commits.
+    """
+    if not payment_ids:
+        return
+    appointments = Appointment.__table__
+    db.session.execute(
+        update(appointments)
+        .where(appointments.c.payment_id.in_(payment_ids))
+        .values(payment_status=status)
+    )
@@ -1,10 +1,11 @@
 from database import db
 from datetime import datetime
+from utils.ids import uuid7
 
 class AppointmentFile(db.Model):
     __tablename__ = 'appointment_files'
     
-    id = db.Column(db.String(36), primary_key=True)  # UUID
+    id = db.Column(db.Uuid, primary_key=True, default=uuid7)  # time-ordered UUIDv7
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     file_size = db.Column(db.Integer, nullable=False)
@@ -20,5 +21,8 @@ class AppointmentFile(db.Model):
     doctor = db.relationship('User', foreign_keys=[doctor_id], backref='shared_appointment_files')
     patient = db.relationship('User', foreign_keys=[patient_id], backref='received_appointment_files')
     
+    def can_download(self, user_id):
+        return user_id in (self.doctor_id, self.patient_id)
+    
     def __repr__(self):
         return f'<AppointmentFile {self.filename}>' 
\ No newline at end of file
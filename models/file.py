@@ -1,10 +1,11 @@
 from database import db
 from datetime import datetime
+from utils.ids import uuid7
 
 class File(db.Model):
     __tablename__ = 'files'
     
-    id = db.Column(db.String(36), primary_key=True)  # UUID
+    id = db.Column(db.Uuid, primary_key=True, default=uuid7)  # time-ordered UUIDv7
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     file_size = db.Column(db.Integer, nullable=False)
@@ -12,5 +13,8 @@ class File(db.Model):
     recipient_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    def can_download(self, user_id):
+        return user_id in (self.sender_id, self.recipient_id)
+    
     def __repr__(self):
         return f'<File {self.filename}>'
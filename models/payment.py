@@ -1,8 +1,15 @@
 from database import db
-from datetime import datetime
+from datetime import datetime, timedelta
+
+# Pending payments younger than this are reused when the payment page is reloaded,
+# so the patient may still be on the eSewa form for one this old
+PAYMENT_REUSE_WINDOW = timedelta(minutes=30)
 
 class Payment(db.Model):
     __tablename__ = 'payments'
+    __table_args__ = (
+        db.Index('ix_payments_appointment_status', 'appointment_id', 'status'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), nullable=False)
@@ -15,11 +22,12 @@ class Payment(db.Model):
     esewa_transaction_code = db.Column(db.String(50), nullable=True)
     esewa_ref_id = db.Column(db.String(50), nullable=True)
     signature = db.Column(db.Text, nullable=True)
+    refund_status = db.Column(db.String(20), nullable=True)  # None, pending, refunded
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
-    appointment = db.relationship('Appointment', backref='payments')
+    appointment = db.relationship('Appointment', foreign_keys=[appointment_id], backref='payments')
 
     def __repr__(self):
         return f'<Payment {self.transaction_uuid}>' 
\ No newline at end of file
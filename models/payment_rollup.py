@@ -0,0 +1,76 @@
+from database import db
+from datetime import datetime
+
+class PaymentDailyRollup(db.Model):
+    """Per doctor, per payment day and per status totals, maintained as payments change status"""
+    __tablename__ = 'payment_daily_rollups'
+
+    doctor_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)  # day the payment was created
+    status = db.Column(db.String(20), primary_key=True)
+    payment_count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Float, nullable=False, default=0.0)
+    tax_amount = db.Column(db.Float, nullable=False, default=0.0)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PaymentDailyRollup {self.doctor_id} {self.day} {self.status}>'
+
+def payment_transition(doctor_id, created_at, amount, tax_amount, total_amount, old_status, new_status):
+    """Describe one payment moving from old_status (None for a new payment) to new_status"""
+    return {
+        'doctor_id': doctor_id,
+        'day': (created_at or datetime.utcnow()).date(),
+        'amount': amount or 0.0,
+        'tax_amount': tax_amount or 0.0,
+        'total_amount': total_amount or 0.0,
+        'old_status': old_status,
+        'new_status': new_status,
+    }
+
+def apply_payment_transitions(transitions):
+    """
+    Fold status transitions into the rollup table with one upsert.
+    Runs in the caller's transaction; the caller commits.
+    """
+    deltas = {}
+    for t in transitions:
+        if t['old_status'] == t['new_status']:
+            continue
+        for status, sign in ((t['old_status'], -1), (t['new_status'], 1)):
+            if status is None:
+                continue
+            delta = deltas.setdefault((t['doctor_id'], t['day'], status), [0, 0.0, 0.0, 0.0])
+            delta[0] += sign
+            delta[1] += sign * t['amount']
+            delta[2] += sign * t['tax_amount']
+            delta[3] += sign * t['total_amount']
+    if not deltas:
+        return
+
+    # Sorted keys give concurrent upserts the same lock order
+    rows = [{
+        'doctor_id': doctor_id, 'day': day, 'status': status,
+        'payment_count': delta[0], 'amount': delta[1], 'tax_amount': delta[2], 'total_amount': delta[3],
+        'updated_at': datetime.utcnow()
+    } for (doctor_id, day, status), delta in sorted(deltas.items())]
+
+    table = PaymentDailyRollup.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['doctor_id', 'day', 'status'],
+        set_={
+            'payment_count': table.c.payment_count + stmt.excluded.payment_count,
+            'amount': table.c.amount + stmt.excluded.amount,
+            'tax_amount': table.c.tax_amount + stmt.excluded.tax_amount,
+            'total_amount': table.c.total_amount + stmt.excluded.total_amount,
+            'updated_at': stmt.excluded.updated_at,
+        }
+    )
+    db.session.execute(stmt)
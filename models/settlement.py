@@ -0,0 +1,17 @@
+from database import db
+
+class SettlementStaging(db.Model):
+    """Rows of an imported eSewa settlement statement, kept only until reconciled"""
+    __tablename__ = 'esewa_settlement_staging'
+
+    # No secondary indexes: rows are bulk loaded and read back by a hash join
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    batch_id = db.Column(db.String(32), nullable=False)
+    transaction_uuid = db.Column(db.String(100), nullable=True)
+    ref_id = db.Column(db.String(50), nullable=True)
+    total_amount = db.Column(db.Float, nullable=True)
+    status = db.Column(db.String(30), nullable=True)
+    settled_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<SettlementStaging {self.transaction_uuid}>'
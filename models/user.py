@@ -12,6 +12,7 @@ class User(db.Model):
     private_key = db.Column(db.Text, nullable=False)
     public_key = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     specialization = db.Column(db.String(100), nullable=True)
     nmc_registration_number = db.Column(db.String(50), nullable=True)
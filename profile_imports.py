@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Profile how long a cold import of the app takes, module by module
+Runs `python -X importtime -c "import app"` in a fresh interpreter and prints
+the slowest modules plus a per-package breakdown of self time.
+"""
+
+import argparse
+import subprocess
+import sys
+import os
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def measure_import(module='app', env=None):
+    """
+    Import module in a fresh interpreter under -X importtime.
+    Returns (rows, loaded) where rows are (self_us, cumulative_us, depth, name)
+    in import order and loaded is the set of module names left in sys.modules.
+    """
+    code = f"import sys; import {module}; print('\\n'.join(sorted(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'import {module} failed:\n{result.stderr[-2000:]}')
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows, set(result.stdout.split())
+
+def total_import_ms(rows, module='app'):
+    """Cumulative import time of module itself, in milliseconds"""
+    for self_us, cumulative_us, depth, name in rows:
+        if name == module:
+            return cumulative_us / 1000.0
+    return 0.0
+
+def package_totals(rows):
+    """Self time summed per top-level package, slowest first"""
+    totals = {}
+    for self_us, cumulative_us, depth, name in rows:
+        package = name.split('.')[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-module import time breakdown for a cold start')
+    parser.add_argument('--module', default='app', help='Module to import')
+    parser.add_argument('--top', type=int, default=25, help='How many modules and packages to list')
+    parser.add_argument('--sort', choices=['cumulative', 'self'], default='cumulative')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs to take the fastest of')
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(max(1, args.repeat))]
+    rows, loaded = min(runs, key=lambda run: total_import_ms(run[0], args.module))
+
+    print(f"🔍 import {args.module}: {total_import_ms(rows, args.module):.1f} ms "
+          f"(fastest of {len(runs)}), {len(loaded)} modules loaded")
+
+    key = 1 if args.sort == 'cumulative' else 0
+    print(f"\n{'self ms':>9}{'cumul ms':>10}  module")
+    for self_us, cumulative_us, depth, name in sorted(rows, key=lambda row: row[key], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f}{cumulative_us / 1000:>10.1f}  {'  ' * depth}{name}")
+
+    print(f"\n{'self ms':>9}  package")
+    for package, self_us in package_totals(rows)[:args.top]:
+        print(f"{self_us / 1000:>9.1f}  {package}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Background worker that reconciles pending payments with eSewa's status API
+Run once with --once, or leave it running to poll every --interval seconds
+"""
+
+import argparse
+import sys
+import os
+import time
+from datetime import timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from models.payment import Payment
+from models.appointment import Appointment
+from utils.esewa import ESewaPayment
+from utils.reconcile import reconcile_pending_payments
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconcile pending eSewa payments')
+    parser.add_argument('--interval', type=int, default=60, help='Seconds between passes')
+    parser.add_argument('--batch-size', type=int, default=100, help='Payments fetched per batch')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent status requests')
+    parser.add_argument('--min-age', type=int, default=300, help='Only check payments older than this many seconds')
+    parser.add_argument('--once', action='store_true', help='Run a single pass and exit')
+    args = parser.parse_args()
+
+    esewa = ESewaPayment()
+    while True:
+        with app.app_context():
+            try:
+                totals = reconcile_pending_payments(
+                    db, Payment, Appointment, esewa,
+                    batch_size=args.batch_size,
+                    max_workers=args.workers,
+                    min_age=timedelta(seconds=args.min_age)
+                )
+                print(f"Reconciliation pass finished: {totals}")
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Reconciliation pass failed: {e}")
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+if __name__ == '__main__':
+    main()
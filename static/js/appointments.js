@@ -0,0 +1,32 @@
+document.getElementById('bulk_select_all').addEventListener('change', function() {
+    document.querySelectorAll('.bulk-select').forEach(cb => cb.checked = this.checked);
+});
+function bulkAction(action) {
+    let ids = Array.from(document.querySelectorAll('.bulk-select:checked')).map(cb => parseInt(cb.value));
+    if (!ids.length) {
+        alert('Select at least one appointment.');
+        return;
+    }
+    let remarks = document.getElementById('bulk_remarks').value;
+    if (action !== 'approve' && !remarks) {
+        alert('Remarks are required.');
+        return;
+    }
+    fetch(`/appointments/bulk/${action}`, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({appointment_ids: ids, remarks: remarks})
+    })
+        .then(resp => resp.json())
+        .then(data => {
+            if (data.error) {
+                alert(data.error);
+                return;
+            }
+            let skipped = data.results.filter(r => r.outcome !== 'updated');
+            if (skipped.length) {
+                alert(`${data.updated} updated, ${skipped.length} skipped: ` + skipped.map(r => `#${r.id} (${r.outcome})`).join(', '));
+            }
+            window.location.reload();
+        });
+}
@@ -0,0 +1,52 @@
+let currentDoctorId = null;
+let currentAvailableTimes = null;
+function openBookingModal(doctorId, doctorName, availableDays, availableTimes) {
+    document.getElementById('modal_doctor_id').value = doctorId;
+    document.getElementById('modal_doctor_name').value = doctorName;
+    currentDoctorId = doctorId;
+    currentAvailableTimes = availableTimes;
+    // Populate available dates
+    let dateSelect = document.getElementById('modal_date');
+    dateSelect.innerHTML = '<option value="">Select date</option>';
+    if (availableDays) {
+        let daysArr = availableDays.split(',');
+        let today = new Date();
+        for (let i = 0; i < 14; i++) {
+            let d = new Date(today.getFullYear(), today.getMonth(), today.getDate() + i);
+            let dayShort = d.toLocaleDateString('en-US', { weekday: 'short' });
+            if (daysArr.includes(dayShort)) {
+                let val = d.toISOString().slice(0,10);
+                let label = d.toLocaleDateString('en-US', { weekday: 'short', month: 'short', day: 'numeric' });
+                dateSelect.innerHTML += `<option value="${val}">${label}</option>`;
+            }
+        }
+    }
+    // Reset time select
+    let timeSelect = document.getElementById('modal_time');
+    timeSelect.innerHTML = '<option value="">Select time</option>';
+}
+document.getElementById('modal_date').addEventListener('change', function() {
+    let date = this.value;
+    let timeSelect = document.getElementById('modal_time');
+    timeSelect.innerHTML = '<option value="">Loading...</option>';
+    fetch(`/api/booked_slots?doctor_id=${currentDoctorId}&date=${date}`)
+        .then(resp => resp.json())
+        .then(data => {
+            let timesArr = currentAvailableTimes ? currentAvailableTimes.split(',') : [];
+            let booked = data.booked || [];
+            let hasAvailable = false;
+            let uniqueTimes = [...new Set(timesArr)];
+            timeSelect.innerHTML = '';
+            uniqueTimes.forEach(function(slot) {
+                // slot is like '18:30-19:00', value should be '18:30'
+                let startTime = slot.split('-')[0];
+                if (!booked.includes(startTime)) {
+                    timeSelect.innerHTML += `<option value="${startTime}">${slot}</option>`;
+                    hasAvailable = true;
+                }
+            });
+            if (!hasAvailable) {
+                timeSelect.innerHTML = '<option value="">No slots available</option>';
+            }
+        });
+});
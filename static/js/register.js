@@ -0,0 +1,12 @@
+function toggleDoctorFields() {
+    var role = document.getElementById('role').value;
+    var doctorFields = document.getElementById('doctor-fields');
+    doctorFields.style.display = (role === 'doctor') ? 'block' : 'none';
+}
+// Collect checked days and time slots before form submit
+document.querySelector('form').addEventListener('submit', function(e) {
+    var days = Array.from(document.querySelectorAll('#available_days_group input[type=checkbox]:checked')).map(cb => cb.value);
+    document.getElementById('available_days').value = days.join(',');
+    var times = Array.from(document.querySelectorAll('#available_time_group input[type=checkbox]:checked')).map(cb => cb.value);
+    document.getElementById('available_time').value = times.join(',');
+});
@@ -0,0 +1,226 @@
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, session
+from werkzeug.exceptions import TooManyRequests, ServiceUnavailable
+from utils.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED
+
+# Per worker process. CPU-bound classes get one in-flight request each, and
+# queued requests hold a thread too. init_admission caps every class, and all
+# classes together, at one thread less than the worker has, so a burst of RSA
+# work always leaves a thread for the cheap pages. Rates are tokens per
+# second, bursts are bucket sizes.
+ADMISSION_CLASSES = {
+    # RSA key generation on /register
+    'keygen': {'concurrency': 1, 'queue': 2, 'queue_timeout': 5,
+               'user_rate': 1 / 60, 'user_burst': 3, 'global_rate': 5, 'global_burst': 10},
+    # RSA encryption of uploads
+    'encrypt': {'concurrency': 1, 'queue': 2, 'queue_timeout': 5,
+                'user_rate': 0.5, 'user_burst': 5, 'global_rate': 5, 'global_burst': 10},
+    # RSA decryption of downloads
+    'decrypt': {'concurrency': 1, 'queue': 2, 'queue_timeout': 5,
+                'user_rate': 1, 'user_burst': 10, 'global_rate': 10, 'global_burst': 20},
+}
+MAX_TRACKED_CLIENTS = 10000
+
+class TokenBucket:
+    """rate tokens per second up to burst; not thread safe, AdmissionClass holds the lock"""
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def wait_time(self):
+        """Seconds until a token is available, 0 when one is available now"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+class ThreadBudget:
+    """Threads held by admitted or queued requests of all classes together, at most limit"""
+    def __init__(self, limit):
+        self.limit = limit
+        self.held = 0
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            if self.held >= self.limit:
+                return False
+            self.held += 1
+            return True
+
+    def give_back(self):
+        with self.lock:
+            self.held -= 1
+
+class AdmissionClass:
+    """
+    Concurrency limit with a short bounded queue, plus a token bucket per
+    client and one shared by everyone. Rate rejections (429) cost nothing;
+    requests that pass the buckets but find every slot and queue place taken
+    get a 503.
+    """
+    def __init__(self, name, concurrency, queue, queue_timeout, user_rate, user_burst, global_rate, global_burst,
+                 budget=None):
+        self.name = name
+        self.budget = budget  # ThreadBudget shared with the other classes, if any
+        self.concurrency = concurrency
+        self.max_queue = queue
+        self.queue_timeout = queue_timeout
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.user_buckets = OrderedDict()  # client identity -> TokenBucket, least recently seen first
+        self.condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_rate = 0
+        self.rejected_busy = 0
+        self.queue_wait_seconds = 0.0
+        self.service_seconds = 1.0  # moving average of how long a slot is held
+
+    def user_bucket(self, identity):
+        bucket = self.user_buckets.get(identity)
+        if bucket is None:
+            bucket = self.user_buckets[identity] = TokenBucket(self.user_rate, self.user_burst)
+            while len(self.user_buckets) > MAX_TRACKED_CLIENTS:
+                self.user_buckets.popitem(last=False)
+        self.user_buckets.move_to_end(identity)
+        return bucket
+
+    def acquire(self, identity, block=True):
+        """
+        Take a slot for identity, waiting in the queue when block is set.
+        Returns the start time to pass to release(); raises TooManyRequests or
+        ServiceUnavailable, both carrying Retry-After. Tokens are only spent
+        once a slot is taken, and a non-blocking attempt is not counted as a
+        rejection: its caller falls back to a blocking one.
+        """
+        with self.condition:
+            bucket = self.user_bucket(identity)
+            wait = max(bucket.wait_time(), self.global_bucket.wait_time())
+            if wait:
+                if block:
+                    self.rejected_rate += 1
+                raise TooManyRequests(f'Too many {self.name} requests, please retry shortly.',
+                                      retry_after=math.ceil(wait))
+            if self.active >= self.concurrency and (not block or self.waiting >= self.max_queue):
+                raise self.busy(block)
+            if self.budget is not None and not self.budget.take():
+                raise self.busy(block)
+            if self.active >= self.concurrency:
+                queued_at = time.monotonic()
+                deadline = queued_at + self.queue_timeout
+                self.waiting += 1
+                self.publish()
+                try:
+                    while self.active >= self.concurrency:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            if self.budget is not None:
+                                self.budget.give_back()
+                            raise self.busy(block)
+                        self.condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+                    self.queue_wait_seconds += time.monotonic() - queued_at
+                    self.publish()
+            bucket.consume()
+            self.global_bucket.consume()
+            self.active += 1
+            self.admitted += 1
+            self.publish()
+            return time.monotonic()
+
+    def busy(self, block):
+        """ServiceUnavailable for a request that found no slot; called with the condition held"""
+        if block:
+            self.rejected_busy += 1
+        return ServiceUnavailable('The server is busy, please retry shortly.', retry_after=self.retry_after())
+
+    def release(self, started):
+        with self.condition:
+            self.active -= 1
+            if self.budget is not None:
+                self.budget.give_back()
+            self.service_seconds = 0.8 * self.service_seconds + 0.2 * (time.monotonic() - started)
+            self.publish()
+            self.condition.notify()
+
+    def publish(self):
+        """Mirror active and waiting into the Prometheus gauges; called with the condition held"""
+        ADMISSION_IN_FLIGHT.labels(self.name).set(self.active)
+        ADMISSION_QUEUED.labels(self.name).set(self.waiting)
+
+    def retry_after(self):
+        """Whole seconds for the current queue to drain at the observed service time"""
+        return max(1, math.ceil(self.service_seconds * (self.waiting + 1) / self.concurrency))
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                'active': self.active,
+                'queued': self.waiting,
+                'concurrency': self.concurrency,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'rejected_rate_limited': self.rejected_rate,
+                'rejected_busy': self.rejected_busy,
+                'queue_wait_seconds': round(self.queue_wait_seconds, 3),
+                'avg_service_seconds': round(self.service_seconds, 3),
+            }
+
+def init_admission(app, threads=None):
+    """
+    Admission classes from ADMISSION_CLASSES, with any per-class overrides in
+    app.config, sized for a worker with threads request threads (default
+    ADMISSION_THREADS, which follows GUNICORN_THREADS)
+    """
+    app.config.setdefault('ADMISSION_ENABLED', True)
+    app.config.setdefault('ADMISSION_THREADS', int(os.environ.get('GUNICORN_THREADS', 4)))
+    # One thread always stays free for requests that do no crypto work
+    limit = max(1, (threads or app.config['ADMISSION_THREADS']) - 1)
+    budget = ThreadBudget(limit)
+    overrides = app.config.get('ADMISSION_CLASSES', {})
+    classes = {}
+    for name, settings in ADMISSION_CLASSES.items():
+        settings = {**settings, **overrides.get(name, {})}
+        settings['concurrency'] = min(settings['concurrency'], limit)
+        settings['queue'] = min(settings['queue'], limit - settings['concurrency'])
+        classes[name] = AdmissionClass(name, budget=budget, **settings)
+    app.extensions['admission'] = classes
+
+def client_identity(user_id=None):
+    """Logged-in user, else the client address (registration happens before login)"""
+    if user_id is None:
+        user_id = session.get('user_id')
+    return f'user:{user_id}' if user_id is not None else f'ip:{request.remote_addr}'
+
+def admission_controlled(name, methods=('POST',)):
+    """Run the view inside an admission slot of class name for the given methods; cheap GETs pass through"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(*args, **kwargs):
+            if request.method not in methods or not current_app.config['ADMISSION_ENABLED']:
+                return view_func(*args, **kwargs)
+            admission = current_app.extensions['admission'][name]
+            started = admission.acquire(client_identity())
+            try:
+                return view_func(*args, **kwargs)
+            finally:
+                admission.release(started)
+        return wrapper
+    return decorator
+
+def admission_snapshot(app):
+    return {name: admission.snapshot() for name, admission in app.extensions['admission'].items()}
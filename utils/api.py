@@ -0,0 +1,119 @@
+import json
+import uuid
+import hashlib
+from datetime import date, time, datetime
+from flask import request, jsonify, current_app, Response
+from itsdangerous import URLSafeSerializer, BadSignature
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+CURSOR_SALT = 'api-cursor'
+
+def parse_fields(available):
+    """Sparse fieldset from ?fields=a,b; every field when absent. Raises ValueError for unknown names"""
+    raw = request.args.get('fields')
+    if not raw:
+        return list(available)
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def serialize(obj, serializers, fields):
+    return {field: serializers[field](obj) for field in fields}
+
+def page_size():
+    size = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def _jsonable(value):
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+def _parse(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type in (date, time, datetime):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+def encode_cursor(values):
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=CURSOR_SALT).dumps([_jsonable(v) for v in values])
+
+def decode_cursor(token, columns):
+    """Sort-key values from an opaque cursor; ValueError when it was not issued by us"""
+    try:
+        values = URLSafeSerializer(current_app.config['SECRET_KEY'], salt=CURSOR_SALT).loads(token)
+    except BadSignature:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+    return [_parse(column, value) for column, value in zip(columns, values)]
+
+def keyset_page(query, columns, cursor_values, limit, descending=False):
+    """
+    Rows after the cursor in (columns) order, using a row-value comparison
+    so each page is an index range scan instead of an OFFSET. Returns (rows, has_more).
+    """
+    if cursor_values is not None:
+        key, after = tuple_(*columns), tuple_(*cursor_values)
+        query = query.filter(key < after if descending else key > after)
+    order = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+def api_etag(*parts):
+    """Weak validator for a response, from the caller identity, request arguments and row versions"""
+    payload = json.dumps([request.path, sorted(request.args.items(multi=True)), *parts], default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+def not_modified(etag):
+    """304 response when the client already holds etag, else None"""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return None
+
+def api_response(payload, etag):
+    response = jsonify(payload)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def api_error(message, status):
+    return jsonify({'error': message}), status
+
+def paginated_response(query, columns, serializers, etag, descending=False, loaders=None):
+    """
+    One page of query as {'data': [...], 'next_cursor': ...} with ?fields=, ?limit= and ?cursor=.
+    etag should already be checked with not_modified(); loaders maps a field to the
+    loader option it needs, so relationships are only joined when a client asks for them.
+    """
+    try:
+        fields = parse_fields(serializers)
+        cursor = request.args.get('cursor')
+        cursor_values = decode_cursor(cursor, columns) if cursor else None
+    except ValueError as e:
+        return api_error(str(e), 400)
+
+    for field, option in (loaders or {}).items():
+        if field in fields:
+            query = query.options(option)
+    limit = page_size()
+    rows, has_more = keyset_page(query, columns, cursor_values, limit, descending)
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    return api_response({
+        'data': [serialize(row, serializers, fields) for row in rows],
+        'next_cursor': next_cursor,
+    }, etag)
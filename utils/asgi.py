@@ -0,0 +1,201 @@
+import time
+import asyncio
+import mimetypes
+import unicodedata
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_cookie
+from werkzeug.routing import Map, Rule
+
+class AsyncRequest:
+    """What an async view gets: the ASGI scope, the decoded Flask session and a way to run blocking work"""
+    def __init__(self, dispatcher, scope):
+        self.dispatcher = dispatcher
+        self.app = dispatcher.app
+        self.scope = scope
+        self.headers = Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers']])
+        self.session = load_session(self.app, parse_cookie(self.headers.get('Cookie', '')))
+
+    async def run_sync(self, func, *args):
+        """Run func(*args) inside an app context on the bridge's thread pool, e.g. for database work"""
+        return await asyncio.get_running_loop().run_in_executor(self.dispatcher.executor, self._in_app_context, func, args)
+
+    def _in_app_context(self, func, args):
+        with self.app.app_context():
+            return func(*args)
+
+    def iterate_in_thread(self, iterable):
+        """Async iterator over a blocking one; each step runs on the thread pool"""
+        return iterate_in_thread(iterable, self.dispatcher.executor)
+
+    def json_response(self, payload, status=200):
+        return AsyncResponse(self.app.json.dumps(payload).encode('utf-8'), status,
+                             {'Content-Type': 'application/json'})
+
+def load_session(app, cookies):
+    """Flask's cookie session, read without a request context; {} when missing or tampered with"""
+    serializer = app.session_interface.get_signing_serializer(app)
+    value = cookies.get(app.config['SESSION_COOKIE_NAME'])
+    if serializer is None or not value:
+        return {}
+    try:
+        return serializer.loads(value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+async def iterate_in_thread(iterable, executor=None):
+    loop = asyncio.get_running_loop()
+    iterator = iter(iterable)
+    done = object()
+    try:
+        while True:
+            item = await loop.run_in_executor(executor, next, iterator, done)
+            if item is done:
+                return
+            yield item
+    finally:
+        # Release the file handle even when the client disconnects mid-stream
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await loop.run_in_executor(executor, close)
+
+class AsyncResponse:
+    """A response body sent in one piece, or streamed when body is an async iterator of bytes"""
+    def __init__(self, body=b'', status=200, headers=None):
+        self.body = body
+        self.status = status
+        self.headers = Headers(headers or {})
+
+    async def __call__(self, send):
+        headers = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in self.headers.items()]
+        if isinstance(self.body, bytes):
+            headers.append((b'content-length', str(len(self.body)).encode('latin-1')))
+            await send({'type': 'http.response.start', 'status': self.status, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': self.body})
+            return
+
+        await send({'type': 'http.response.start', 'status': self.status, 'headers': headers})
+        try:
+            async for chunk in self.body:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            close = getattr(self.body, 'aclose', None)
+            if close is not None:
+                await close()
+        await send({'type': 'http.response.body', 'body': b''})
+
+class AsgiDispatcher:
+    """
+    ASGI application in front of a Flask app.
+    Requests matching an async view are served on the event loop; everything
+    else, and any request the async view hands back by returning None, goes
+    through the Flask app on a bounded thread pool. Async views therefore only
+    need to cover the happy path: errors, redirects and flash messages stay
+    in the Flask views.
+    """
+    def __init__(self, app, routes, threads=4, on_shutdown=(), observe=None, in_progress=None):
+        self.app = app
+        self.url_map = Map([Rule(rule, endpoint=view, methods=methods) for rule, view, methods in routes])
+        # Report async views under the Flask endpoint of the same rule, so both paths share series
+        flask_endpoints = {r.rule: r.endpoint for r in app.url_map.iter_rules()}
+        self.endpoints = {view: flask_endpoints.get(rule, view.__name__) for rule, view, methods in routes}
+        self.observe = observe
+        self.in_progress = in_progress  # gauge-like, inc()/dec() around each async view
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-sync')
+        self.wsgi = WSGIMiddleware(app, workers=threads)
+        self.on_shutdown = list(on_shutdown)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http':
+            view, values = self.match(scope)
+            if view is not None:
+                started = time.perf_counter()
+                if self.in_progress is not None:
+                    self.in_progress.inc()
+                # None while the view may still hand the request to Flask, whose hooks count it
+                status = None
+                try:
+                    response = await view(AsyncRequest(self, scope), **values)
+                    if response is not None:
+                        status = response.status
+                        await response(send)
+                except Exception:
+                    status = 500
+                    raise
+                finally:
+                    if self.in_progress is not None:
+                        self.in_progress.dec()
+                    if status is not None and self.observe is not None:
+                        self.observe(self.endpoints[view], scope['method'], status, time.perf_counter() - started)
+                if status is not None:
+                    return
+        await self.wsgi(scope, receive, send)
+
+    def match(self, scope):
+        """(async view, URL values) for the request, or (None, None) to hand it to Flask"""
+        if scope['method'] == 'HEAD':
+            return None, None
+        try:
+            return self.url_map.bind('localhost').match(scope['path'], method=scope['method'])
+        except HTTPException:
+            return None, None
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for hook in self.on_shutdown:
+                    await hook()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+async def prefetch(chunks):
+    """
+    Pull the first chunk of an async stream before any header is sent, so a
+    view can still hand a failing request back to Flask; returns a stream
+    that replays it
+    """
+    first = await anext(chunks, None)
+
+    async def replay():
+        try:
+            if first is not None:
+                yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+    return replay()
+
+async def release_after(chunks, release):
+    """Pass chunks through and call release() once the stream is finished or abandoned"""
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        await chunks.aclose()
+        release()
+
+def attachment_response(chunks, filename):
+    """Streamed download headers as send_file(as_attachment=True) would set them"""
+    headers = Headers()
+    headers.set('Content-Type', mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    try:
+        filename.encode('ascii')
+    except UnicodeEncodeError:
+        # RFC 5987 name for browsers that support it, an ASCII approximation for the rest
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        headers.set('Content-Disposition', 'attachment', filename=simple,
+                    **{'filename*': f"UTF-8''{quote(filename, safe='!#$&+-.^_`|~')}"})
+    else:
+        headers.set('Content-Disposition', 'attachment', filename=filename)
+    return AsyncResponse(chunks, headers=headers)
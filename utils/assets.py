@@ -0,0 +1,54 @@
+import os
+import json
+import mimetypes
+from flask import current_app, request, send_from_directory
+
+# Build output lives under static/ so Flask's static route still matches it
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Precompressed variants written by build_assets.py, best first
+PRECOMPRESSED = [('br', '.br'), ('gzip', '.gz')]
+
+def load_manifest(static_folder):
+    """Source path -> fingerprinted path, or {} when assets have not been built"""
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def init_assets(app):
+    """
+    Serve fingerprinted assets when a build manifest exists.
+    url_for('static', filename='css/style.css') then points at the hashed copy,
+    which is served precompressed when the client accepts it and cached forever.
+    """
+    manifest = load_manifest(app.static_folder)
+    app.extensions['asset_manifest'] = manifest
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = f"{DIST_DIR}/{manifest[values['filename']]}"
+
+    app.view_functions['static'] = serve_static
+
+def serve_static(filename):
+    """Static view: built assets get immutable caching and precompressed bodies, the rest is unchanged"""
+    if not filename.startswith(DIST_DIR + '/'):
+        return current_app.send_static_file(filename)
+
+    static_folder = current_app.static_folder
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    for encoding, suffix in PRECOMPRESSED:
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+            response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(static_folder, filename, mimetype=mimetype)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,91 @@
+import time
+import threading
+from collections import OrderedDict
+
+class SingleFlightCache:
+    """
+    In-process cache with per-entry TTL and single-flight loading.
+    Concurrent misses for the same key wait for one loader call and share its
+    result. ttl_for(value) decides how long a value lives: None caches it
+    until evicted, 0 or less does not cache it at all.
+    """
+    def __init__(self, ttl_for, max_entries=10000):
+        self.ttl_for = ttl_for
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (value, expires_at or None)
+        self.in_flight = {}           # key -> _Flight
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Cached value for key or None, without loading"""
+        with self.lock:
+            return self._lookup(key)
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() at most once across concurrent callers"""
+        with self.lock:
+            value = self._lookup(key)
+            if value is not None:
+                return value
+            flight = self.in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.in_flight[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                if flight.error is None:
+                    self._store(key, flight.value)
+                del self.in_flight[key]
+            flight.done.set()
+        return flight.value
+
+    def set(self, key, value):
+        """Store a value loaded elsewhere, e.g. by an async caller, under the usual TTL rules"""
+        with self.lock:
+            self._store(key, value)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def _lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        ttl = self.ttl_for(value)
+        if ttl is not None and ttl <= 0:
+            return
+        self.entries[key] = (value, None if ttl is None else time.monotonic() + ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
@@ -0,0 +1,104 @@
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # br is only offered when the brotli package is installed
+    brotli = None
+
+COMPRESS_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/calendar', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/xml', 'image/svg+xml',
+}
+COMPRESS_MIN_SIZE = 500   # bytes; smaller bodies are not worth the header and CPU
+COMPRESS_LEVEL = 6        # gzip level; brotli uses COMPRESS_BR_QUALITY
+COMPRESS_BR_QUALITY = 5
+
+def init_compression(app):
+    """Compress eligible responses with br or gzip, negotiated from Accept-Encoding"""
+    app.config.setdefault('COMPRESS_MIMETYPES', COMPRESS_MIMETYPES)
+    app.config.setdefault('COMPRESS_MIN_SIZE', COMPRESS_MIN_SIZE)
+    app.config.setdefault('COMPRESS_LEVEL', COMPRESS_LEVEL)
+    app.config.setdefault('COMPRESS_BR_QUALITY', COMPRESS_BR_QUALITY)
+
+    @app.after_request
+    def compress_response(response):
+        return compress(response, app.config)
+
+def choose_encoding():
+    """br if the client takes it and we can produce it, else gzip, else None"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def should_compress(response, config):
+    if request.method == 'HEAD' or response.status_code != 200:
+        return False
+    if 'Content-Encoding' in response.headers or 'no-transform' in response.headers.get('Cache-Control', ''):
+        return False
+    # File downloads (decrypted uploads, private keys) go out untouched
+    if response.headers.get('Content-Disposition', '').startswith('attachment'):
+        return False
+    return response.mimetype in config['COMPRESS_MIMETYPES']
+
+def compress(response, config):
+    if not should_compress(response, config):
+        return response
+    # Set even when this body stays small: other responses for the URL may be encoded
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    length = response.content_length
+    if encoding is None or (length is not None and length < config['COMPRESS_MIN_SIZE']):
+        return response
+
+    if response.is_streamed or response.direct_passthrough:
+        # Generators and file bodies are compressed chunk by chunk as they are sent
+        response.direct_passthrough = False
+        response.response = _compress_stream(response.response, _compressor(encoding, config))
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        compressor = _compressor(encoding, config)
+        response.set_data(compressor.compress(data) + compressor.flush())
+
+    response.headers['Content-Encoding'] = encoding
+    # The encoded bytes differ, so a strong validator would be wrong; weak still allows 304s
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+class _BrotliCompressor:
+    def __init__(self, quality):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.finish()
+
+def _compressor(encoding, config):
+    if encoding == 'br':
+        return _BrotliCompressor(config['COMPRESS_BR_QUALITY'])
+    return zlib.compressobj(config['COMPRESS_LEVEL'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+def _compress_stream(chunks, compressor):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        # Let stream_with_context and file wrappers release their resources
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
@@ -4,6 +4,9 @@ from cryptography.hazmat.backends import default_backend
 import os
 import base64
 
+# Ciphertext chunks decrypted per streamed block (190 plaintext bytes each, ~12 KB per block)
+DECRYPT_BLOCK_CHUNKS = 64
+
 class RSAEncryption:
     def __init__(self):
         self.backend = default_backend()
@@ -84,35 +87,37 @@ class RSAEncryption:
         
         return encrypted_file_path
     
-    def decrypt_file(self, encrypted_file_path, private_key_pem):
-        """Decrypt a file using RSA private key"""
+    def iter_decrypted_chunks(self, encrypted_file_path, private_key_pem, chunks_per_block=DECRYPT_BLOCK_CHUNKS):
+        """
+        Decrypt a file block by block, yielding plaintext as it is recovered
+        Nothing happens until the first block is requested, so callers can run
+        each step (disk read plus RSA work) off the request thread.
+        """
         private_key = self.load_private_key(private_key_pem)
+        oaep = padding.OAEP(
+            mgf=padding.MGF1(algorithm=hashes.SHA256()),
+            algorithm=hashes.SHA256(),
+            label=None
+        )
         
-        # Read encrypted file
         with open(encrypted_file_path, 'rb') as f:
             # Read number of chunks
             num_chunks = int.from_bytes(f.read(4), byteorder='big')
             
-            decrypted_chunks = []
+            block = []
             for _ in range(num_chunks):
-                # Read chunk length
+                # Each chunk is stored as its length followed by the ciphertext
                 chunk_length = int.from_bytes(f.read(4), byteorder='big')
-                # Read encrypted chunk
-                encrypted_chunk = f.read(chunk_length)
-                
-                # Decrypt chunk
-                decrypted_chunk = private_key.decrypt(
-                    encrypted_chunk,
-                    padding.OAEP(
-                        mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                        algorithm=hashes.SHA256(),
-                        label=None
-                    )
-                )
-                decrypted_chunks.append(decrypted_chunk)
-        
-        # Combine decrypted chunks
-        decrypted_data = b''.join(decrypted_chunks)
+                block.append(private_key.decrypt(f.read(chunk_length), oaep))
+                if len(block) == chunks_per_block:
+                    yield b''.join(block)
+                    block = []
+            if block:
+                yield b''.join(block)
+    
+    def decrypt_file(self, encrypted_file_path, private_key_pem):
+        """Decrypt a file using RSA private key"""
+        decrypted_data = b''.join(self.iter_decrypted_chunks(encrypted_file_path, private_key_pem))
         
         # Save decrypted file
         decrypted_file_path = encrypted_file_path.replace('.encrypted', '.decrypted')
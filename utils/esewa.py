@@ -1,21 +1,188 @@
+import os
 import hmac
 import hashlib
 import base64
 import json
-import uuid
-from datetime import datetime
+import time
+import random
+import threading
 from urllib.parse import urlencode
-import requests
+from utils.cache import SingleFlightCache
+from utils.ids import uuid7
+
+# Outbound HTTP settings for the status API
+CONNECT_TIMEOUT = 3
+READ_TIMEOUT = 10
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.5  # seconds, doubled per attempt with full jitter
+STATUS_DEADLINE = 15  # seconds for a whole status check, retries included
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+class CircuitBreaker:
+    """
+    Fail fast while the gateway is unhealthy.
+    Opens after failure_threshold consecutive failures, lets a single trial
+    request through after reset_timeout seconds, and closes again on success.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_in_flight or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+# Final statuses never change; anything else is re-checked after STATUS_CACHE_TTL seconds
+FINAL_STATUSES = {'COMPLETE', 'FAILED', 'CANCELED'}
+STATUS_CACHE_TTL = 10
+
+def _status_ttl(response):
+    if 'error' in response:
+        return 0
+    if response.get('status') in FINAL_STATUSES:
+        return None
+    return STATUS_CACHE_TTL
+
+status_cache = SingleFlightCache(_status_ttl)
+
+_session = None
+_session_lock = threading.Lock()
+status_circuit_breaker = CircuitBreaker()
+
+def get_http_session():
+    """Process-wide keep-alive session with a connection pool shared by all ESewaPayment instances"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # requests is only imported once something actually calls eSewa
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                # Retries are handled in check_transaction_status so they can be jittered
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+_async_client = None
+# Status lookups in progress on the ASGI event loop, so concurrent checks share one call
+_async_status_flights = {}  # transaction_uuid -> asyncio.Task
+
+def get_async_http_client():
+    """Process-wide httpx client for the ASGI server; must first be called on its event loop"""
+    global _async_client
+    if _async_client is None:
+        import httpx
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        )
+    return _async_client
+
+async def close_async_http_client():
+    global _async_client
+    if _async_client is not None:
+        client, _async_client = _async_client, None
+        await client.aclose()
+
+def _finish_async_flight(transaction_uuid, task):
+    _async_status_flights.pop(transaction_uuid, None)
+    if not task.cancelled() and task.exception() is None:
+        status_cache.set(transaction_uuid, task.result())
+
+def load_esewa_config():
+    """eSewa settings from the environment, falling back to the UAT sandbox"""
+    return {
+        'secret_key': os.environ.get('ESEWA_SECRET_KEY', "8gBm/:&EnhH.1/q"),  # UAT secret key (without trailing parenthesis)
+        'product_code': os.environ.get('ESEWA_PRODUCT_CODE', "EPAYTEST"),
+        'form_url': os.environ.get('ESEWA_FORM_URL', "https://rc-epay.esewa.com.np/api/epay/main/v2/form"),
+        'production_url': "https://epay.esewa.com.np/api/epay/main/v2/form",
+        'status_url': os.environ.get('ESEWA_STATUS_URL', "https://rc.esewa.com.np/api/epay/transaction/status/"),
+        'status_production_url': "https://epay.esewa.com.np/api/epay/transaction/status/",
+    }
+
+class HMACSigner:
+    """
+    HMAC SHA-256 signer keyed once.
+    Each message is signed on a copy of the keyed state, so the key schedule
+    is not recomputed per call, and verification is constant time.
+    """
+    def __init__(self, secret_key):
+        self._keyed = hmac.new(secret_key.encode('utf-8'), digestmod=hashlib.sha256)
+
+    @staticmethod
+    def build_message(data, signed_field_names=None):
+        """Message string for the fields listed in signed_field_names, in that order"""
+        if signed_field_names is None:
+            signed_field_names = data.get('signed_field_names', '')
+        return ','.join(f"{field}={data[field]}" for field in signed_field_names.split(',') if field in data)
+
+    def sign(self, message):
+        mac = self._keyed.copy()
+        mac.update(message.encode('utf-8'))
+        return base64.b64encode(mac.digest()).decode('utf-8')
+
+    def verify(self, message, signature):
+        if not isinstance(signature, str):
+            return False
+        return hmac.compare_digest(self.sign(message).encode('utf-8'), signature.encode('utf-8'))
+
+    def sign_many(self, messages):
+        """Signatures for a batch of message strings"""
+        return [self.sign(message) for message in messages]
+
+    def verify_many(self, items):
+        """Verify a batch of (data, signature) pairs built from signed_field_names"""
+        return [self.verify(self.build_message(data), signature) for data, signature in items]
+
+ESEWA_CONFIG = load_esewa_config()
+esewa_signer = HMACSigner(ESEWA_CONFIG['secret_key'])
 
 class ESewaPayment:
-    def __init__(self):
-        # eSewa configuration
-        self.secret_key = "8gBm/:&EnhH.1/q"  # UAT secret key (without trailing parenthesis)
-        self.product_code = "EPAYTEST"
-        self.test_url = "https://rc-epay.esewa.com.np/api/epay/main/v2/form"
-        self.production_url = "https://epay.esewa.com.np/api/epay/main/v2/form"
-        self.status_check_test_url = "https://rc.esewa.com.np/api/epay/transaction/status/"
-        self.status_check_production_url = "https://epay.esewa.com.np/api/epay/transaction/status/"
+    def __init__(self, config=None):
+        # eSewa configuration is loaded once per process; pass config to override it
+        config = config or ESEWA_CONFIG
+        self.secret_key = config['secret_key']
+        self.product_code = config['product_code']
+        self.test_url = config['form_url']
+        self.production_url = config['production_url']
+        self.status_check_test_url = config['status_url']
+        self.status_check_production_url = config['status_production_url']
+        self.signer = esewa_signer if config is ESEWA_CONFIG else HMACSigner(self.secret_key)
+        self.circuit_breaker = status_circuit_breaker
+
+    @property
+    def session(self):
+        """Shared HTTP session, created on the first outbound call"""
+        return get_http_session()
         
     def generate_signature(self, total_amount, transaction_uuid, product_code):
         """
@@ -24,59 +191,32 @@ class ESewaPayment:
         # Create the message string in the required order
         # Note: The order should be exactly as specified in signed_field_names
         message = f"total_amount={total_amount},transaction_uuid={transaction_uuid},product_code={product_code}"
-        
-        # Create HMAC SHA-256 signature
-        hmac_obj = hmac.new(
-            self.secret_key.encode('utf-8'),
-            message.encode('utf-8'),
-            hashlib.sha256
-        )
-        
-        # Get the digest and encode to base64
-        digest = hmac_obj.digest()
-        signature = base64.b64encode(digest).decode('utf-8')
-        
-        return signature
+        return self.signer.sign(message)
     
     def verify_signature(self, data, signature):
         """
         Verify the signature from eSewa response
         """
-        # Extract signed fields from the response
-        signed_field_names = data.get('signed_field_names', '')
-        signed_fields = signed_field_names.split(',')
-        
         # Build the message string in the same order as signed_field_names
-        message_parts = []
-        for field in signed_fields:
-            if field in data:
-                message_parts.append(f"{field}={data[field]}")
-        
-        message = ','.join(message_parts)
-        
-        # Generate signature for verification
-        hmac_obj = hmac.new(
-            self.secret_key.encode('utf-8'),
-            message.encode('utf-8'),
-            hashlib.sha256
-        )
-        
-        digest = hmac_obj.digest()
-        expected_signature = base64.b64encode(digest).decode('utf-8')
-        
-        return signature == expected_signature
+        return self.signer.verify(self.signer.build_message(data), signature)
+    
+    def verify_signatures(self, responses):
+        """
+        Verify a batch of decoded eSewa responses, e.g. for reconciliation
+        """
+        return self.signer.verify_many([(data, data.get('signature', '')) for data in responses])
     
     def generate_transaction_uuid(self):
         """
         Generate a unique transaction UUID for eSewa
+        Time-ordered UUIDv7, so IDs never collide and sort by creation time
         """
-        timestamp = datetime.now().strftime("%y%m%d-%H%M%S")
-        unique_id = str(uuid.uuid4())[:8]
-        return f"{timestamp}-{unique_id}"
+        return str(uuid7())
     
-    def create_payment_form_data(self, appointment, amount, tax_amount=0, service_charge=0, delivery_charge=0):
+    def create_payment_form_data(self, appointment, amount, tax_amount=0, service_charge=0, delivery_charge=0, transaction_uuid=None):
         """
         Create payment form data for eSewa
+        Pass transaction_uuid to rebuild the form for an existing payment
         """
         # Validate input parameters
         if amount < 0:
@@ -88,7 +228,8 @@ class ESewaPayment:
         if delivery_charge < 0:
             raise ValueError("Delivery charge cannot be negative")
         
-        transaction_uuid = self.generate_transaction_uuid()
+        if transaction_uuid is None:
+            transaction_uuid = self.generate_transaction_uuid()
         total_amount = amount + tax_amount + service_charge + delivery_charge
         
         # Ensure all values are properly formatted as strings
@@ -120,23 +261,134 @@ class ESewaPayment:
         
         return form_data, transaction_uuid
     
+    def status_url(self, transaction_uuid, total_amount, product_code=None):
+        if product_code is None:
+            product_code = self.product_code
+        return f"{self.status_check_test_url}?product_code={product_code}&total_amount={total_amount}&transaction_uuid={transaction_uuid}"
+    
+    def read_status_response(self, response):
+        """
+        (retry, result) for a status API response; works for requests and httpx responses
+        Gateway errors are retried, anything else settles the call and closes the breaker.
+        """
+        if response.status_code in RETRY_STATUS_CODES or response.status_code >= 500:
+            return True, {'error': f'HTTP {response.status_code}: {response.text}'}
+        self.circuit_breaker.record_success()
+        if response.status_code != 200:
+            return False, {'error': f'HTTP {response.status_code}: {response.text}'}
+        try:
+            return False, response.json()
+        except ValueError as e:
+            return False, {'error': f'Request failed: {str(e)}'}
+    
     def check_transaction_status(self, transaction_uuid, total_amount, product_code=None):
         """
         Check transaction status from eSewa
         """
-        if product_code is None:
-            product_code = self.product_code
-            
-        url = f"{self.status_check_test_url}?product_code={product_code}&total_amount={total_amount}&transaction_uuid={transaction_uuid}"
+        url = self.status_url(transaction_uuid, total_amount, product_code)
         
-        try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {'error': f'HTTP {response.status_code}: {response.text}'}
-        except requests.exceptions.RequestException as e:
-            return {'error': f'Request failed: {str(e)}'}
+        if not self.circuit_breaker.allow_request():
+            return {'error': 'eSewa status service unavailable (circuit open)'}
+
+        from requests.exceptions import ReadTimeout, RequestException
+
+        # Read timeouts are not retried: the gateway is up but slow, and another
+        # attempt would only keep the request thread waiting longer
+        deadline = time.monotonic() + STATUS_DEADLINE
+        last_error = None
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                delay = random.uniform(0, RETRY_BACKOFF * (2 ** (attempt - 1)))
+                if time.monotonic() + delay + CONNECT_TIMEOUT > deadline:
+                    break
+                time.sleep(delay)
+            remaining = deadline - time.monotonic()
+            try:
+                response = self.session.get(url, timeout=(min(CONNECT_TIMEOUT, remaining), min(READ_TIMEOUT, remaining)))
+            except ReadTimeout as e:
+                last_error = {'error': f'Request failed: {str(e)}'}
+                break
+            except RequestException as e:
+                last_error = {'error': f'Request failed: {str(e)}'}
+                continue
+            retry, result = self.read_status_response(response)
+            if retry:
+                last_error = result
+                continue
+            return result
+
+        self.circuit_breaker.record_failure()
+        return last_error
+    
+    async def check_transaction_status_async(self, transaction_uuid, total_amount, product_code=None):
+        """
+        check_transaction_status for the ASGI server: the request and the
+        retry backoff are awaited, so no thread waits on the gateway
+        """
+        import asyncio
+        import httpx
+
+        url = self.status_url(transaction_uuid, total_amount, product_code)
+        
+        if not self.circuit_breaker.allow_request():
+            return {'error': 'eSewa status service unavailable (circuit open)'}
+
+        # Same retry rules as check_transaction_status: one deadline, no retry after a read timeout
+        deadline = time.monotonic() + STATUS_DEADLINE
+        last_error = None
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                delay = random.uniform(0, RETRY_BACKOFF * (2 ** (attempt - 1)))
+                if time.monotonic() + delay + CONNECT_TIMEOUT > deadline:
+                    break
+                await asyncio.sleep(delay)
+            remaining = deadline - time.monotonic()
+            try:
+                response = await get_async_http_client().get(
+                    url, timeout=httpx.Timeout(min(READ_TIMEOUT, remaining), connect=min(CONNECT_TIMEOUT, remaining))
+                )
+            except httpx.ReadTimeout as e:
+                last_error = {'error': f'Request failed: {str(e)}'}
+                break
+            except httpx.HTTPError as e:
+                last_error = {'error': f'Request failed: {str(e)}'}
+                continue
+            retry, result = self.read_status_response(response)
+            if retry:
+                last_error = result
+                continue
+            return result
+
+        self.circuit_breaker.record_failure()
+        return last_error
+    
+    def check_transaction_status_cached(self, transaction_uuid, total_amount, product_code=None):
+        """
+        Check transaction status through the process-wide status cache.
+        Concurrent lookups for the same transaction share one upstream call.
+        """
+        return status_cache.get_or_load(
+            transaction_uuid,
+            lambda: self.check_transaction_status(transaction_uuid, total_amount, product_code)
+        )
+    
+    async def check_transaction_status_cached_async(self, transaction_uuid, total_amount, product_code=None):
+        """
+        Async counterpart of check_transaction_status_cached, sharing its cache.
+        Concurrent lookups on the event loop await one upstream call.
+        """
+        import asyncio
+
+        cached = status_cache.get(transaction_uuid)
+        if cached is not None:
+            return cached
+        task = _async_status_flights.get(transaction_uuid)
+        if task is None:
+            task = asyncio.ensure_future(self.check_transaction_status_async(transaction_uuid, total_amount, product_code))
+            _async_status_flights[transaction_uuid] = task
+            task.add_done_callback(lambda done: _finish_async_flight(transaction_uuid, done))
+        # A waiter that goes away (client disconnect) must not cancel the call for the others
+        return await asyncio.shield(task)
     
     def decode_esewa_response(self, encoded_response):
         """
@@ -0,0 +1,130 @@
+import time
+import threading
+from collections import OrderedDict
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from sqlalchemy import select, func
+
+class MemoryFragmentStore:
+    """Per-process LRU store for rendered fragments"""
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (html, expires_at or None)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            html, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return html
+
+    def set(self, key, html, ttl=None):
+        with self.lock:
+            self.entries[key] = (html, None if ttl is None else time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class RedisFragmentStore:
+    """Store shared by all workers, backed by any client with get() and set(key, value, ex=ttl)"""
+    def __init__(self, client, prefix='fragment:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        html = self.client.get(self.prefix + key)
+        return html.decode('utf-8') if isinstance(html, bytes) else html
+
+    def set(self, key, html, ttl=None):
+        self.client.set(self.prefix + key, html, ex=ttl)
+
+class FragmentCacheExtension(Extension):
+    """
+    {% cache key, ttl %}...{% endcache %}
+    key is a value or tuple of values and should include whatever versions
+    the fragment depends on; ttl (seconds) is optional. On a hit the body is
+    not evaluated, so queries it would trigger never run.
+    """
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache_store=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        ttl = parser.parse_expression() if parser.stream.skip_if('comma') else nodes.Const(None)
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_cached', [key, ttl]), [], [], body).set_lineno(lineno)
+
+    def _cached(self, key, ttl, caller):
+        store = self.environment.fragment_cache_store
+        if store is None:
+            return caller()
+        key = fragment_key(key)
+        html = store.get(key)
+        if html is None:
+            html = str(caller())
+            store.set(key, html, ttl)
+        # Already escaped when it was rendered
+        return Markup(html)
+
+def fragment_key(key):
+    parts = key if isinstance(key, (tuple, list)) else (key,)
+    return ':'.join(str(part) for part in parts)
+
+def init_fragment_cache(app, store=None):
+    """Enable {% cache %} in app's templates; store defaults to a per-process MemoryFragmentStore"""
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache_store = store if store is not None else MemoryFragmentStore()
+
+class deferred:
+    """
+    List whose loader runs the first time a template looks at it.
+    Views pass these in place of query results so a cached fragment skips the query too.
+    """
+    def __init__(self, loader):
+        self.loader = loader
+        self.items = None
+
+    def _load(self):
+        if self.items is None:
+            self.items = list(self.loader())
+        return self.items
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __bool__(self):
+        return bool(self._load())
+
+    def __getitem__(self, index):
+        return self._load()[index]
+
+def row_versions(db, **markers):
+    """
+    Change markers for fragment keys, read in one round trip.
+    Each marker is (timestamp_column, *criteria) and becomes 'count-newest'
+    for the rows the criteria select, so inserts, deletes and updates all move it.
+    """
+    columns = []
+    for column, *criteria in markers.values():
+        columns.append(select(func.count()).select_from(column.class_).where(*criteria).scalar_subquery())
+        columns.append(select(func.max(column)).where(*criteria).scalar_subquery())
+    row = db.session.execute(select(*columns)).one()
+    return {name: f'{row[2 * i]}-{row[2 * i + 1] or 0}' for i, name in enumerate(markers)}
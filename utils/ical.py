@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+# Slots offered at registration are 30 minutes long
+APPOINTMENT_DURATION = timedelta(minutes=30)
+
+def escape_text(value):
+    """Escape a TEXT property value as required by RFC 5545"""
+    return (str(value or '')
+            .replace('\\', '\\\\')
+            .replace(';', '\\;')
+            .replace(',', '\\,')
+            .replace('\r\n', '\\n')
+            .replace('\n', '\\n'))
+
+def fold_line(line):
+    """Fold a content line to 75 octets, continuation lines start with a space"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(encoded))
+        # Do not split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+def calendar_header(name):
+    """Opening lines of a VCALENDAR"""
+    return ''.join(fold_line(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//SecureHealth//Appointments//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+    ])
+
+def calendar_footer():
+    """Closing line of a VCALENDAR"""
+    return 'END:VCALENDAR\r\n'
+
+def appointment_event(appt_id, appt_date, appt_time, status, summary, description, stamp, host='securehealth'):
+    """Render one appointment as a VEVENT, cancelled/rejected ones as STATUS:CANCELLED"""
+    start = datetime.combine(appt_date, appt_time)
+    end = start + APPOINTMENT_DURATION
+    event_status = 'CANCELLED' if status in ('cancelled', 'rejected') else (
+        'CONFIRMED' if status == 'approved' else 'TENTATIVE')
+    stamp = stamp or datetime.utcnow()
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:appointment-{appt_id}@{host}',
+        f'DTSTAMP:{stamp.strftime("%Y%m%dT%H%M%SZ")}',
+        f'LAST-MODIFIED:{stamp.strftime("%Y%m%dT%H%M%SZ")}',
+        f'DTSTART:{start.strftime("%Y%m%dT%H%M%S")}',
+        f'DTEND:{end.strftime("%Y%m%dT%H%M%S")}',
+        f'SUMMARY:{escape_text(summary)}',
+        f'DESCRIPTION:{escape_text(description)}',
+        f'STATUS:{event_status}',
+        'END:VEVENT',
+    ]
+    return ''.join(fold_line(line) for line in lines)
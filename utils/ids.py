@@ -0,0 +1,37 @@
+import os
+import time
+import uuid
+import threading
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+def uuid7():
+    """
+    Time-ordered UUID (RFC 9562 version 7).
+    48-bit millisecond timestamp, then a 12-bit counter that keeps IDs from the
+    same millisecond in order, then 62 random bits. New IDs sort after older
+    ones, so inserts land at the right edge of the primary-key index.
+    """
+    global _last_ms, _counter
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            _counter = int.from_bytes(os.urandom(2), 'big') & 0x3FF  # leave headroom for this millisecond
+        else:
+            _counter += 1
+            if _counter > 0xFFF:
+                # Counter exhausted: borrow the next millisecond rather than repeat a value
+                _last_ms += 1
+                _counter = 0
+        timestamp, counter = _last_ms, _counter
+
+    rand = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    value = (timestamp & ((1 << 48) - 1)) << 80
+    value |= 0x7 << 76
+    value |= counter << 64
+    value |= 0b10 << 62
+    value |= rand
+    return uuid.UUID(int=value)
@@ -0,0 +1,80 @@
+import os
+import time
+from flask import g, request, has_request_context, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+
+# Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+# (set up in gunicorn.conf.py before the app is imported) and /metrics merges
+# them, so a scrape sees the whole server whichever worker answers it.
+REQUEST_COUNT = Counter('http_requests_total', 'HTTP requests handled', ['endpoint', 'method', 'status'])
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Time to produce a response', ['endpoint', 'method'])
+REQUESTS_IN_PROGRESS = Gauge('http_requests_in_progress', 'Requests being handled', multiprocess_mode='livesum')
+DB_STATEMENTS = Histogram('http_request_db_statements', 'SQL statements executed per request', ['endpoint'],
+                          buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200))
+DB_SECONDS = Histogram('http_request_db_seconds', 'Time spent executing SQL per request', ['endpoint'],
+                       buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+DB_STATEMENTS_TOTAL = Counter('db_statements_total', 'SQL statements executed while handling requests', ['endpoint'])
+# Set by AdmissionClass whenever its counters change, so they stay current while no request completes
+ADMISSION_IN_FLIGHT = Gauge('admission_in_flight', 'Requests holding an admission slot', ['admission_class'],
+                            multiprocess_mode='livesum')
+ADMISSION_QUEUED = Gauge('admission_queued', 'Requests waiting for an admission slot', ['admission_class'],
+                         multiprocess_mode='livesum')
+
+def init_metrics(app, db):
+    """
+    Request count, latency, status and per-request SQL metrics for app.
+    Call before other after_request hooks are registered, so the latency
+    includes them (Flask runs after_request functions in reverse order).
+    """
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.db_statements = 0
+        g.db_seconds = 0.0
+        REQUESTS_IN_PROGRESS.inc()
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_started' not in g:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        observe_request(endpoint, request.method, response.status_code, time.perf_counter() - g.metrics_started)
+        DB_STATEMENTS.labels(endpoint).observe(g.db_statements)
+        DB_SECONDS.labels(endpoint).observe(g.db_seconds)
+        DB_STATEMENTS_TOTAL.labels(endpoint).inc(g.db_statements)
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        if g.pop('metrics_started', None) is not None:
+            REQUESTS_IN_PROGRESS.dec()
+
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Statements outside a request (scripts, the async views' thread pool) are not attributed
+    if has_request_context() and 'db_statements' in g:
+        g.db_statements += 1
+        g.db_seconds += time.perf_counter() - context.metrics_started
+
+def observe_request(endpoint, method, status, seconds):
+    REQUEST_COUNT.labels(endpoint, method, str(status)).inc()
+    REQUEST_LATENCY.labels(endpoint, method).observe(seconds)
+
+def metrics_response():
+    """Prometheus text exposition, merged across workers in multiprocess mode"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), headers={'Content-Type': CONTENT_TYPE_LATEST})
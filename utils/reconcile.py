@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import update, select, bindparam
+from models.payment_rollup import payment_transition, apply_payment_transitions
+from models.appointment import PAYABLE_STATUSES, set_current_payment_status
+from models.payment import PAYMENT_REUSE_WINDOW
+
+# eSewa status API values -> our Payment.status; anything else stays pending
+ESEWA_STATUS_MAP = {
+    'COMPLETE': 'completed',
+    'CANCELED': 'cancelled',
+    'NOT_FOUND': 'failed',
+}
+
+def esewa_payment_status(response, created_at):
+    """
+    Our status for an eSewa status response, or None while the payment stays
+    pending. eSewa only knows a transaction once the form is submitted, and a
+    pending payment is reused for PAYMENT_REUSE_WINDOW, so NOT_FOUND is not
+    final until then.
+    """
+    status = response.get('status')
+    if status == 'NOT_FOUND' and created_at > datetime.utcnow() - PAYMENT_REUSE_WINDOW:
+        return None
+    return ESEWA_STATUS_MAP.get(status)
+
+def fetch_pending_batch(db, Payment, after_id=0, batch_size=100, min_age=timedelta(minutes=5)):
+    """Next batch of pending payments old enough that their callback should have arrived"""
+    cutoff = datetime.utcnow() - min_age
+    return db.session.query(
+        Payment.id, Payment.transaction_uuid, Payment.total_amount, Payment.product_code, Payment.created_at
+    ).filter(
+        Payment.status == 'pending',
+        Payment.created_at <= cutoff,
+        Payment.id > after_id
+    ).order_by(Payment.id).limit(batch_size).all()
+
+def query_statuses(esewa, rows, max_workers=8):
+    """Ask eSewa about every row concurrently, at most max_workers requests in flight"""
+    def check(row):
+        payment_id, transaction_uuid, total_amount, product_code, created_at = row
+        return payment_id, created_at, esewa.check_transaction_status(
+            transaction_uuid=transaction_uuid,
+            total_amount=total_amount,
+            product_code=product_code
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(check, rows))
+
+def apply_statuses(db, Payment, Appointment, responses):
+    """Write the batch's final statuses with one UPDATE per status, then approve paid appointments"""
+    by_status = {}
+    ref_ids = {}
+    for payment_id, created_at, response in responses:
+        new_status = esewa_payment_status(response, created_at)
+        if 'error' in response or new_status is None:
+            continue
+        by_status.setdefault(new_status, []).append(payment_id)
+        ref_ids[payment_id] = response.get('ref_id')
+    if not by_status:
+        return {}
+
+    now = datetime.utcnow()
+    payments = Payment.__table__
+    appointments = Appointment.__table__
+    summary = {}
+    transitions = []
+    changed = []
+    for new_status, payment_ids in sorted(by_status.items()):
+        # status == 'pending' guard keeps a callback that landed meanwhile from being overwritten
+        rows = db.session.execute(
+            update(payments)
+            .where(payments.c.id.in_(payment_ids), payments.c.status == 'pending')
+            .values(status=new_status, updated_at=now)
+            .returning(
+                payments.c.id, payments.c.appointment_id, payments.c.created_at,
+                payments.c.amount, payments.c.tax_amount, payments.c.total_amount
+            )
+        ).all()
+        if not rows:
+            continue
+        summary[new_status] = len(rows)
+        changed.extend(row.id for row in rows)
+
+        appointment_ids = [row.appointment_id for row in rows]
+        doctors = dict(db.session.execute(
+            select(appointments.c.id, appointments.c.doctor_id).where(appointments.c.id.in_(appointment_ids))
+        ).all())
+        transitions.extend(payment_transition(
+            doctors.get(row.appointment_id), row.created_at, row.amount,
+            row.tax_amount, row.total_amount, 'pending', new_status
+        ) for row in rows)
+
+        if new_status == 'completed':
+            db.session.execute(
+                update(appointments)
+                .where(appointments.c.id.in_(appointment_ids), appointments.c.status == 'pending')
+                .values(status='approved', updated_at=now)
+            )
+            # A completed payment becomes current even if a later attempt was started,
+            # as in complete_payment only on appointments that are still payable
+            db.session.execute(
+                update(appointments)
+                .where(appointments.c.id == bindparam('b_appointment_id'), appointments.c.status.in_(PAYABLE_STATUSES))
+                .values(payment_id=bindparam('b_payment_id'), payment_status='completed'),
+                [{'b_appointment_id': row.appointment_id, 'b_payment_id': row.id} for row in rows]
+            )
+            # Paid for an appointment that was cancelled or rejected meanwhile
+            closed = set(db.session.execute(
+                select(appointments.c.id).where(
+                    appointments.c.id.in_(appointment_ids), appointments.c.status.not_in(PAYABLE_STATUSES)
+                )
+            ).scalars())
+            refunds = [row.id for row in rows if row.appointment_id in closed]
+            if refunds:
+                db.session.execute(update(payments).where(payments.c.id.in_(refunds)).values(refund_status='pending'))
+        else:
+            set_current_payment_status([row.id for row in rows], new_status)
+
+    if changed:
+        db.session.execute(
+            update(payments).where(payments.c.id == bindparam('b_id')).values(esewa_ref_id=bindparam('b_ref_id')),
+            [{'b_id': payment_id, 'b_ref_id': ref_ids[payment_id]} for payment_id in changed]
+        )
+        apply_payment_transitions(transitions)
+    db.session.commit()
+    return summary
+
+def reconcile_pending_payments(db, Payment, Appointment, esewa, batch_size=100, max_workers=8,
+                               min_age=timedelta(minutes=5)):
+    """One full pass over pending payments; returns counts of checked rows and applied statuses"""
+    totals = {'checked': 0}
+    after_id = 0
+    while True:
+        rows = fetch_pending_batch(db, Payment, after_id, batch_size, min_age)
+        if not rows:
+            break
+        after_id = rows[-1][0]
+        # Release the read transaction while waiting on the network
+        db.session.rollback()
+        responses = query_statuses(esewa, rows, max_workers)
+        for status, count in apply_statuses(db, Payment, Appointment, responses).items():
+            totals[status] = totals.get(status, 0) + count
+        totals['checked'] += len(rows)
+        if len(rows) < batch_size:
+            break
+    return totals
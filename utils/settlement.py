@@ -0,0 +1,189 @@
+import csv
+import io
+from datetime import datetime
+from sqlalchemy import text, insert, delete, func
+
+# Accepted header spellings for each staging column, compared case-insensitively
+COLUMN_ALIASES = {
+    'transaction_uuid': ['transaction_uuid', 'transaction uuid', 'product_id', 'pid'],
+    'ref_id': ['ref_id', 'refid', 'ref id', 'reference_id', 'reference id'],
+    'total_amount': ['total_amount', 'total amount', 'amount'],
+    'status': ['status', 'transaction status'],
+    'settled_at': ['settled_at', 'settlement date', 'transaction date', 'date'],
+}
+STAGING_COLUMNS = ['batch_id', 'transaction_uuid', 'ref_id', 'total_amount', 'status', 'settled_at']
+DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y']
+
+def map_columns(header):
+    """Position of each staging column in the statement header"""
+    normalized = [h.strip().lower() for h in header]
+    positions = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                positions[column] = normalized.index(alias)
+                break
+    if 'transaction_uuid' not in positions and 'ref_id' not in positions:
+        raise ValueError('Statement needs a transaction_uuid or ref_id column')
+    return positions
+
+def parse_amount(value):
+    value = (value or '').replace(',', '').strip()
+    return float(value) if value else None
+
+def parse_datetime(value):
+    value = (value or '').strip()
+    if not value:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f'Unrecognised date: {value}')
+
+def read_statement(path, batch_id):
+    """Yield normalised staging rows from a settlement CSV, one at a time"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        positions = map_columns(next(reader))
+
+        def field(row, column):
+            pos = positions.get(column)
+            return row[pos].strip() if pos is not None and pos < len(row) and row[pos].strip() else None
+
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            yield {
+                'batch_id': batch_id,
+                'transaction_uuid': field(row, 'transaction_uuid'),
+                'ref_id': field(row, 'ref_id'),
+                'total_amount': parse_amount(field(row, 'total_amount')),
+                'status': field(row, 'status'),
+                'settled_at': parse_datetime(field(row, 'settled_at')),
+            }
+
+class CopyStream:
+    """File-like view over row dicts rendered as CSV, for COPY ... FROM STDIN without buffering the file"""
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = ''
+        self.count = 0
+
+    def _render(self, row):
+        out = io.StringIO()
+        values = []
+        for column in STAGING_COLUMNS:
+            value = row[column]
+            values.append('' if value is None else (value.isoformat(' ') if isinstance(value, datetime) else value))
+        csv.writer(out).writerow(values)
+        return out.getvalue()
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.buffer += self._render(next(self.rows))
+                self.count += 1
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+    readline = read
+
+def load_statement(db, SettlementStaging, path, batch_id, chunk_size=5000):
+    """Bulk load a statement into staging: COPY on PostgreSQL, chunked executemany elsewhere"""
+    rows = read_statement(path, batch_id)
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        stream = CopyStream(rows)
+        cursor = connection.connection.cursor()
+        cursor.copy_expert(
+            f"COPY {SettlementStaging.__tablename__} ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            stream
+        )
+        db.session.commit()
+        return stream.count
+
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            db.session.execute(insert(SettlementStaging.__table__), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(insert(SettlementStaging.__table__), chunk)
+        count += len(chunk)
+    db.session.commit()
+    return count
+
+RECONCILE_SQL = """
+SELECT * FROM (
+    SELECT s.transaction_uuid, s.ref_id,
+           s.total_amount AS statement_amount, s.status AS statement_status,
+           COALESCE(p.id, p2.id) AS payment_id,
+           COALESCE(p.total_amount, p2.total_amount) AS payment_amount,
+           COALESCE(p.status, p2.status) AS payment_status,
+           CASE
+               WHEN COALESCE(p.id, p2.id) IS NULL THEN 'missing_payment'
+               WHEN s.total_amount IS NOT NULL
+                    AND ABS(COALESCE(p.total_amount, p2.total_amount) - s.total_amount) > 0.005 THEN 'amount_mismatch'
+               WHEN (UPPER(COALESCE(s.status, 'COMPLETE')) = 'COMPLETE')
+                    <> (COALESCE(p.status, p2.status) = 'completed') THEN 'status_drift'
+               ELSE 'ok'
+           END AS issue
+    FROM esewa_settlement_staging s
+    LEFT JOIN payments p ON p.transaction_uuid = s.transaction_uuid
+    LEFT JOIN payments p2 ON p.id IS NULL AND p2.esewa_ref_id = s.ref_id
+    WHERE s.batch_id = :batch_id
+) matched
+WHERE issue <> 'ok'
+UNION ALL
+SELECT p.transaction_uuid, p.esewa_ref_id, NULL, NULL, p.id, p.total_amount, p.status, 'missing_settlement'
+FROM payments p
+WHERE :check_missing = 1
+  AND p.status = 'completed'
+  AND p.updated_at >= :window_start AND p.updated_at <= :window_end
+  AND NOT EXISTS (SELECT 1 FROM esewa_settlement_staging s
+                  WHERE s.batch_id = :batch_id AND s.transaction_uuid = p.transaction_uuid)
+  AND NOT EXISTS (SELECT 1 FROM esewa_settlement_staging s
+                  WHERE s.batch_id = :batch_id AND s.ref_id = p.esewa_ref_id)
+"""
+
+RESULT_COLUMNS = ['transaction_uuid', 'ref_id', 'statement_amount', 'statement_status',
+                  'payment_id', 'payment_amount', 'payment_status', 'issue']
+
+def reconcile_statement(db, SettlementStaging, batch_id, window_start=None, window_end=None):
+    """
+    Stream reconciliation issues for a loaded batch from one set-based query.
+    Completed payments without a statement row are reported only when a
+    window is known, either passed in or taken from the statement's dates.
+    """
+    if window_start is None or window_end is None:
+        first, last = db.session.query(
+            func.min(SettlementStaging.settled_at), func.max(SettlementStaging.settled_at)
+        ).filter(SettlementStaging.batch_id == batch_id).one()
+        window_start = window_start or first
+        window_end = window_end or last
+    check_missing = 1 if window_start and window_end else 0
+
+    result = db.session.execute(
+        text(RECONCILE_SQL).execution_options(stream_results=True, yield_per=1000),
+        {
+            'batch_id': batch_id,
+            'check_missing': check_missing,
+            'window_start': window_start or datetime.min,
+            'window_end': window_end or datetime.max,
+        }
+    )
+    for row in result:
+        yield dict(zip(RESULT_COLUMNS, row))
+
+def drop_batch(db, SettlementStaging, batch_id):
+    db.session.execute(delete(SettlementStaging.__table__).where(SettlementStaging.__table__.c.batch_id == batch_id))
+    db.session.commit()
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+def parse_slots(available_time):
+    """Split a doctor's available_time string ('18:00-18:30,18:30-19:00') into slots"""
+    if not available_time:
+        return []
+    return [s.strip() for s in available_time.split(',') if s.strip()]
+
+def find_earliest_slots(doctors, booked, start_date=None, days=14, limit=10, now=None):
+    """
+    Find the earliest free slots across many doctors at once.
+
+    doctors is a list of User rows, booked an iterable of (doctor_id, date, time)
+    tuples for the window. Availability and bookings are laid out as boolean
+    arrays of shape (doctors, days, slots) and intersected in one pass.
+    """
+    # Imported here so workers that never serve this endpoint skip loading NumPy
+    import numpy as np
+
+    if now is None:
+        now = datetime.now()
+    if start_date is None:
+        start_date = now.date()
+    if not doctors or days <= 0 or limit <= 0:
+        return []
+
+    # Column universe: every distinct slot any doctor offers, ordered by start time
+    doctor_slots = [parse_slots(d.available_time) for d in doctors]
+    slot_labels = sorted({s for slots in doctor_slots for s in slots}, key=lambda s: s.split('-')[0])
+    if not slot_labels:
+        return []
+    slot_index = {s: i for i, s in enumerate(slot_labels)}
+    start_index = {s.split('-')[0]: i for i, s in enumerate(slot_labels)}
+    doctor_index = {d.id: i for i, d in enumerate(doctors)}
+
+    n_doctors, n_slots = len(doctors), len(slot_labels)
+    window = [start_date + timedelta(days=i) for i in range(days)]
+    weekdays = np.array([d.weekday() for d in window])
+
+    # Per-doctor weekday and slot masks, broadcast into (doctors, days, slots)
+    weekday_mask = np.zeros((n_doctors, 7), dtype=bool)
+    slot_mask = np.zeros((n_doctors, n_slots), dtype=bool)
+    for i, doctor in enumerate(doctors):
+        for day in (doctor.available_days or '').split(','):
+            if day.strip() in WEEKDAY_NAMES:
+                weekday_mask[i, WEEKDAY_NAMES.index(day.strip())] = True
+        for s in doctor_slots[i]:
+            slot_mask[i, slot_index[s]] = True
+    available = weekday_mask[:, weekdays][:, :, None] & slot_mask[:, None, :]
+
+    taken = np.zeros_like(available)
+    rows, cols, slots = [], [], []
+    for doctor_id, appt_date, appt_time in booked:
+        day_offset = (appt_date - start_date).days
+        col = start_index.get(appt_time.strftime('%H:%M'))
+        if doctor_id in doctor_index and 0 <= day_offset < days and col is not None:
+            rows.append(doctor_index[doctor_id])
+            cols.append(day_offset)
+            slots.append(col)
+    if rows:
+        taken[rows, cols, slots] = True
+
+    free = available & ~taken
+
+    # Slots that already started today are not bookable
+    if window[0] == now.date():
+        current = now.strftime('%H:%M')
+        started = np.array([s.split('-')[0] <= current for s in slot_labels])
+        free[:, 0, started] = False
+
+    # Order by (day, slot, doctor) and take the first `limit` hits
+    hits = np.flatnonzero(free.transpose(1, 2, 0))[:limit]
+    day_idx, slot_idx, doc_idx = np.unravel_index(hits, (days, n_slots, n_doctors))
+
+    results = []
+    for d, s, i in zip(day_idx.tolist(), slot_idx.tolist(), doc_idx.tolist()):
+        doctor = doctors[i]
+        results.append({
+            'doctor_id': doctor.id,
+            'doctor_name': doctor.name,
+            'specialization': doctor.specialization,
+            'consultation_fee': doctor.consultation_fee,
+            'date': window[d].isoformat(),
+            'time': slot_labels[s].split('-')[0],
+            'slot': slot_labels[s]
+        })
+    return results
@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from flask import request, has_request_context
+from sqlalchemy import event
+
+SLOW_QUERY_MS = 200          # statements slower than this are logged
+SLOW_QUERY_EXPLAIN_RATE = 0.1  # share of logged SELECTs that also get a plan
+EXPLAIN_TIMEOUT_MS = 5000    # EXPLAIN ANALYZE runs the query again, so it gets a budget
+MAX_PENDING = 100            # slow queries waiting for the writer; more are dropped
+# Only plain reads are explained: ANALYZE executes the statement, and a
+# data-modifying CTE or FOR UPDATE must never run twice
+EXPLAIN_PREFIXES = {'postgresql': 'EXPLAIN (ANALYZE, BUFFERS) ', 'sqlite': 'EXPLAIN QUERY PLAN '}
+
+class SlowQueryLog:
+    """
+    Engine listener for slow statements. The request thread only times the
+    statement, redacts its parameters and queues it; a background thread runs
+    the sampled EXPLAIN on its own connection and writes one JSON line per
+    statement, so logging adds no latency to the request.
+    """
+    def __init__(self, threshold_ms, explain_rate, stream=None):
+        self.threshold = threshold_ms / 1000
+        self.explain_rate = explain_rate
+        self.stream = stream or sys.stderr
+        self.pending = queue.Queue(maxsize=MAX_PENDING)
+        self.dropped = 0
+        self.writer = None
+        self.writer_pid = None
+        self.lock = threading.Lock()
+
+    def attach(self, engine):
+        if not event.contains(engine, 'before_cursor_execute', self.before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context.slow_query_started = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.slow_query_started
+        if elapsed < self.threshold or not context.execution_options.get('slow_query_log', True):
+            return
+        entry = {
+            'time': datetime.utcnow().isoformat(),
+            'duration_ms': round(elapsed * 1000, 2),
+            'statement': statement,
+            'params': redact(parameters),
+            'executemany': executemany,
+            **origin(),
+        }
+        explain = (not executemany and is_plain_select(statement)
+                   and conn.dialect.name in EXPLAIN_PREFIXES and random.random() < self.explain_rate)
+        self.ensure_writer()
+        try:
+            # Raw parameters stay in memory for EXPLAIN only, they are never written out
+            self.pending.put_nowait((entry, conn.engine, parameters if explain else None, explain))
+        except queue.Full:
+            self.dropped += 1
+
+    def ensure_writer(self):
+        """Start the writer thread in this process; a thread started before a fork does not survive it"""
+        if self.writer_pid == os.getpid():
+            return
+        with self.lock:
+            if self.writer_pid != os.getpid():
+                self.writer = threading.Thread(target=self.run, name='slow-query-log', daemon=True)
+                self.writer.start()
+                self.writer_pid = os.getpid()
+
+    def run(self):
+        while True:
+            entry, engine, parameters, explain = self.pending.get()
+            try:
+                if explain:
+                    entry['plan'] = explain_plan(engine, entry['statement'], parameters)
+                self.stream.write(json.dumps(entry, default=str) + '\n')
+                self.stream.flush()
+            except Exception as e:
+                print(f"Slow query log error: {e}")
+            finally:
+                self.pending.task_done()
+
+def redact(parameters):
+    """Parameter shapes without their values: names and types only, never patient data"""
+    if isinstance(parameters, dict):
+        return {key: _placeholder(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: the shape of the first row is enough
+            return {'rows': len(parameters), 'first': redact(parameters[0])}
+        return [_placeholder(value) for value in parameters]
+    return _placeholder(parameters)
+
+def _placeholder(value):
+    return None if value is None else f'<{type(value).__name__}>'
+
+def origin():
+    """The route that issued the statement, or the thread for scripts and background work"""
+    if has_request_context():
+        return {'endpoint': request.endpoint or 'unmatched', 'method': request.method,
+                'route': request.url_rule.rule if request.url_rule else request.path}
+    return {'endpoint': None, 'thread': threading.current_thread().name}
+
+def is_plain_select(statement):
+    text = statement.lstrip().upper()
+    return text.startswith('SELECT') and 'FOR UPDATE' not in text and 'FOR SHARE' not in text
+
+def explain_plan(engine, statement, parameters):
+    """Plan lines for statement, run on a separate connection and rolled back"""
+    prefix = EXPLAIN_PREFIXES[engine.dialect.name]
+    with engine.connect() as conn:
+        conn = conn.execution_options(slow_query_log=False)
+        with conn.begin() as transaction:
+            if engine.dialect.name == 'postgresql':
+                conn.exec_driver_sql(f'SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}')
+            rows = conn.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+            transaction.rollback()
+    return [' '.join(str(column) for column in row) for row in rows]
+
+def init_slow_query_log(app, db):
+    """
+    Opt-in: SLOW_QUERY_LOG=1 logs statements over SLOW_QUERY_MS to stderr,
+    or to SLOW_QUERY_LOG_FILE, with SLOW_QUERY_EXPLAIN_RATE of the SELECTs explained
+    """
+    app.config.setdefault('SLOW_QUERY_LOG', os.environ.get('SLOW_QUERY_LOG') == '1')
+    app.config.setdefault('SLOW_QUERY_MS', float(os.environ.get('SLOW_QUERY_MS', SLOW_QUERY_MS)))
+    app.config.setdefault('SLOW_QUERY_EXPLAIN_RATE', float(os.environ.get('SLOW_QUERY_EXPLAIN_RATE', SLOW_QUERY_EXPLAIN_RATE)))
+    app.config.setdefault('SLOW_QUERY_LOG_FILE', os.environ.get('SLOW_QUERY_LOG_FILE'))
+    if not app.config['SLOW_QUERY_LOG']:
+        return None
+
+    stream = open(app.config['SLOW_QUERY_LOG_FILE'], 'a') if app.config['SLOW_QUERY_LOG_FILE'] else None
+    log = SlowQueryLog(app.config['SLOW_QUERY_MS'], app.config['SLOW_QUERY_EXPLAIN_RATE'], stream)
+    with app.app_context():
+        log.attach(db.engine)
+    app.extensions['slow_query_log'] = log
+    return log
@@ -0,0 +1,6 @@
+"""
+Production WSGI entrypoint
+Run with: gunicorn --config gunicorn.conf.py wsgi:app
+"""
+
+from app import app